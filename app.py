@@ -1,12 +1,29 @@
+import csv
+import io
+import math
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify, render_template, redirect, url_for, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_required, current_user
 from flask_bcrypt import Bcrypt
-from simulation import simulate_tournament, chalk_bracket, random_bracket, random_probabilistic_bracket, ranking_bracket
+from simulation import build_bracket, fixed_results, get_model, STRATEGY_RULES
 from simulation import SEED_REGION_MAPPING, REGION_TO_ROUND_ID, TEAMS
-from scoring import score_bracket
-from models import TournamentResult, Bracket, Group, GroupMembership, GroupBracketSelection
+from win_probability import data_version
+from odds import advancement_odds, exact_odds, normalize_weight, snap_sims, DEFAULT_SIMS
+from forecasts import refresh_forecasts, GLOBAL_SCOPE
+from leaderboard import leaderboard_page, my_group_entries, PAGE_SIZE
+from results import bump_results_version, results_version, true_results
+import cache
+from rescoring import CoalescingWorker, RescoreWorker, DERIVED_PASS, FULL_PASS, apply_result_delta, rescore_all
+from picks import backfill_picks, load_picks, result_problem, store_picks
+import autofill_pool
+from optimizer import optimal_bracket, contrarian_bracket, DEFAULT_BUDGET, MAX_BUDGET
+from models import TournamentResult, Bracket, BracketForecast, Group, GroupMembership, GroupBracketSelection
+from models import GroupScore, GroupScoringRules, Standing
+from scoring import DEFAULT_ROUND_POINTS, TIEBREAKERS
 import pandas as pd
 
 # To reset the database in terminal:
@@ -72,6 +89,20 @@ app.register_blueprint(auth_blueprint)
 # ---------------------------------------
 with app.app_context():
     db.create_all()
+    # create_all skips indexes added to a table that already exists
+    for index in Bracket.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+# ---------------------------------------
+# CLI COMMANDS
+# ---------------------------------------
+@app.cli.command("backfill-picks")
+def backfill_picks_command():
+    """Store canonical picks for brackets saved before they existed."""
+    print(f"{backfill_picks()} bracket(s) backfilled.")
+
+# Start drawing autofill brackets for the default strategy settings
+autofill_pool.warm([(name, 0.25) for name in autofill_pool.POOLED_STRATEGIES])
 
 # ---------------------------------------
 # PAGE ROUTES
@@ -131,49 +162,34 @@ def help_page():
 def contact_page():
     return render_template("contact.html")
 
+# Scores land a moment after a result is saved, so pages are keyed by the
+# results version but only kept briefly
+LEADERBOARD_TTL = 15
+
+
+def _leaderboard_page(after=None, limit=PAGE_SIZE):
+    return cache.cached("leaderboard", results_version(), (after or "", limit),
+                        lambda: leaderboard_page(after, limit), ttl=LEADERBOARD_TTL)
+
 @app.route("/leaderboard")
-def leaderboard_page():
-    brackets = (Bracket.query
-                .filter_by(is_submitted=True)
-                .order_by(Bracket.score.desc())
-                .all())
-    return render_template("leaderboard.html", brackets=brackets)
+def leaderboard():
+    brackets, next_cursor = _leaderboard_page()
+    return render_template("leaderboard.html", brackets=brackets, next_cursor=next_cursor)
+
+@app.route("/api/leaderboard")
+def leaderboard_api():
+    """?after=<cursor>&limit=<n> -> { "entries": [...], "next": cursor or null }"""
+    try:
+        entries, next_cursor = _leaderboard_page(request.args.get("after"),
+                                                 request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit."}), 400
+    return jsonify({"entries": entries, "next": next_cursor})
 
 @app.route("/my_groups")
 @login_required
 def my_groups_page():
-    memberships = GroupMembership.query.filter_by(user_id=current_user.id).all()
-    groups_data = []
-    for membership in memberships:
-        group = membership.group
-        # All selected brackets in this group ordered by score
-        all_selected = (Bracket.query
-                        .join(GroupBracketSelection, GroupBracketSelection.bracket_id == Bracket.id)
-                        .filter(GroupBracketSelection.group_id == group.id)
-                        .filter(Bracket.is_submitted.is_(True))
-                        .order_by(Bracket.score.desc(), Bracket.id.asc())
-                        .all())
-        # Assign ranks (tied scores share rank)
-        ranked = []
-        current_rank = 1
-        for i, b in enumerate(all_selected):
-            if i > 0 and b.score < all_selected[i - 1].score:
-                current_rank = i + 1
-            ranked.append((b, current_rank))
-
-        # My brackets in this group with their rank
-        my_selected_ids = {
-            s.bracket_id for s in GroupBracketSelection.query.filter_by(
-                group_id=group.id, user_id=current_user.id).all()
-        }
-        my_entries = [(b, rank) for b, rank in ranked if b.id in my_selected_ids]
-
-        groups_data.append({
-            "group": group,
-            "my_entries": my_entries,
-            "total_entries": len(all_selected),
-        })
-    return render_template("my_groups.html", groups_data=groups_data)
+    return render_template("my_groups.html", groups_data=my_group_entries(current_user.id))
 
 @app.route("/create_group", methods=["POST"])
 @login_required
@@ -265,11 +281,17 @@ def group_page(group_id):
         for selection in GroupBracketSelection.query.filter_by(group_id=group_id, user_id=current_user.id).all()
     }
 
-    selected_brackets = (Bracket.query
+    # Scores under the group's rules and their ranks, stored by
+    # rescoring.refresh_group_scores / refresh_standings; a selection not
+    # scored yet shows its standard score
+    group_score = db.func.coalesce(GroupScore.score, Bracket.score)
+    selected_brackets = (db.session.query(Bracket, group_score, Standing.rank, Standing.previous_rank)
                          .join(GroupBracketSelection, GroupBracketSelection.bracket_id == Bracket.id)
+                         .outerjoin(GroupScore, (GroupScore.group_id == group_id) & (GroupScore.bracket_id == Bracket.id))
+                         .outerjoin(Standing, (Standing.scope == group_id) & (Standing.bracket_id == Bracket.id))
                          .filter(GroupBracketSelection.group_id == group_id)
                          .filter(Bracket.is_submitted.is_(True))
-                         .order_by(Bracket.score.desc(), Bracket.id.asc())
+                         .order_by(group_score.desc(), db.func.coalesce(GroupScore.tiebreak, 0).desc(), Bracket.id.asc())
                          .all())
 
     true_results = _build_true_results()
@@ -279,7 +301,10 @@ def group_page(group_id):
         selected_brackets=selected_brackets,
         user_submitted_brackets=user_submitted_brackets,
         selected_ids=selected_ids,
-        true_results=true_results
+        true_results=true_results,
+        rules=group.scoring_rules,
+        default_round_points=DEFAULT_ROUND_POINTS,
+        tiebreakers=TIEBREAKERS
     )
 
 
@@ -325,12 +350,51 @@ def update_group_brackets(group_id):
         db.session.add(GroupBracketSelection(group_id=group_id, user_id=current_user.id, bracket_id=bracket_id))
 
     db.session.commit()
+    # The group's scores and ranks catch up in the background
+    _rescore_worker.request(group_id)
     return jsonify({"message": "Group brackets updated."})
 
+
+def _is_whole(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@app.route("/groups/<int:group_id>/scoring_rules", methods=["POST"])
+@login_required
+def update_group_scoring_rules(group_id):
+    group = Group.query.get_or_404(group_id)
+    if group.owner_id != current_user.id:
+        return jsonify({"error": "Only the group owner can change its scoring."}), 403
+
+    data = request.get_json(force=True)
+    round_points = data.get("round_points", DEFAULT_ROUND_POINTS)
+    upset_bonus  = data.get("upset_bonus", 0)
+    tiebreaker   = data.get("tiebreaker", "none")
+
+    # Whole numbers only: int() would also take "123456", 2.7 or True
+    if (not isinstance(round_points, list) or len(round_points) != len(DEFAULT_ROUND_POINTS)
+            or not all(_is_whole(p) and 0 <= p <= 1000 for p in round_points)):
+        return jsonify({"error": "round_points needs 6 whole numbers between 0 and 1000, Round of 64 first."}), 400
+    if not _is_whole(upset_bonus) or not (0 <= upset_bonus <= 100):
+        return jsonify({"error": "Upset bonus must be a whole number between 0 and 100."}), 400
+    if tiebreaker not in TIEBREAKERS:
+        return jsonify({"error": f"Tiebreaker must be one of: {', '.join(TIEBREAKERS)}."}), 400
+
+    if group.scoring_rules is None:
+        group.scoring_rules = GroupScoringRules()
+    group.scoring_rules.round_points = round_points
+    group.scoring_rules.upset_bonus = upset_bonus
+    group.scoring_rules.tiebreaker = tiebreaker
+    db.session.commit()
+
+    _rescore_worker.request(group_id)
+    return jsonify({"message": "Scoring rules saved."})
+
 @app.route("/rankings_stats")
 def rankings_stats_page():
     # Send the merged data to the frontend
-    data_json = rankings_stats.to_dict(orient="records")
+    data_json = cache.cached("rankings", get_model().version, (),
+                             lambda: rankings_stats.to_dict(orient="records"))
     return render_template("ranking_stats.html", data=data_json)
 
 
@@ -342,26 +406,182 @@ def rankings_stats_page():
 def autofill_bracket():
     data     = request.get_json(force=True)
     strategy = data.get("strategy", "simulation")  # single default value only
-    weight   = float(data.get("weight", 0.25))
+    seed     = data.get("seed")  # optional: same strategy/weight/seed -> same bracket
 
+    # Checked before anything reaches the pool or a strategy: NaN or inf
+    # would fail deep inside them
     try:
-        if strategy == "chalk":
-            bracket = chalk_bracket()
-        elif strategy == "random":
-            bracket = random_bracket()
-        elif strategy == "probabilistic (by seed)":
-            bracket = random_probabilistic_bracket()
-        elif strategy == "by ranking":
-            bracket = ranking_bracket()
-        else:
-            # "simulation" or anything unrecognised
-            bracket = simulate_tournament(weight=weight)
+        weight = float(data.get("weight", 0.25))
+    except (ValueError, TypeError):
+        weight = None
+    if weight is None or not math.isfinite(weight) or not 0 <= weight <= 1:
+        return jsonify({"error": "weight must be a number between 0 and 1."}), 400
+
+    if seed is not None:
+        try:
+            seed = int(seed)
+        except (ValueError, TypeError):
+            return jsonify({"error": "seed must be an integer."}), 400
+        if seed < 0:
+            return jsonify({"error": "seed must be non-negative."}), 400
+
+    # Deterministic given the model and the results entered so far
+    if strategy == "optimal":
+        return jsonify(optimal_bracket(weight, fixed_results(_build_true_results())))
+
+    # Runs for its time budget, so it is queued and polled for
+    if strategy == "contrarian":
+        return _start_contrarian_job(data, weight, seed)
+
+    # "simulation" or anything unrecognised
+    if strategy not in STRATEGY_RULES:
+        strategy = "simulation"
+
+    # Unseeded requests are served from the pre-simulated pool when it has one ready
+    if seed is None:
+        body = autofill_pool.take(strategy, weight)
+        if body is not None:
+            return app.response_class(body, mimetype="application/json")
+
+    try:
+        bracket = build_bracket(STRATEGY_RULES[strategy](weight), seed)
     except Exception as e:
         print("Autofill error:", e)
         return jsonify({"error": str(e)}), 500
 
     return jsonify(bracket)
 
+
+# -------------------------------------------------------
+# CONTRARIAN AUTOFILL JOBS
+# -------------------------------------------------------
+# A job runs on this process's pool, but its status lives in the shared
+# cache ("autofill_job" family) so any worker can answer a poll. A finished
+# result is dropped when it is collected, and JOB_TTL expires jobs nobody
+# polls, or whose process died before finishing.
+_optimizer_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="optimizer")
+JOB_TTL = 600
+
+
+def _store_job(job_id, user_id, future):
+    """Done-callback: replace the job's "running" entry with its outcome."""
+    try:
+        job = {"user_id": user_id, "status": "done", "result": future.result()}
+    except Exception as e:
+        print("Contrarian autofill error:", e)
+        job = {"user_id": user_id, "status": "failed", "error": str(e)}
+    cache.put("autofill_job", 0, (job_id,), job, JOB_TTL)
+
+
+def _population_picks(group_id=None):
+    """(brackets, 63) picks of the submitted brackets, or of those entered in a group."""
+    query = Bracket.query.filter(Bracket.is_submitted.is_(True))
+    if group_id is not None:
+        query = query.join(GroupBracketSelection, GroupBracketSelection.bracket_id == Bracket.id) \
+                     .filter(GroupBracketSelection.group_id == group_id)
+    return load_picks(query)[1]
+
+
+def _start_contrarian_job(data, weight, seed):
+    group_id = data.get("group_id")
+    try:
+        budget = min(max(float(data.get("budget", DEFAULT_BUDGET)), 0.5), MAX_BUDGET)
+        group_id = int(group_id) if group_id is not None else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "budget and group_id must be numbers."}), 400
+
+    if group_id is not None and not GroupMembership.query.filter_by(
+            group_id=group_id, user_id=current_user.id).first():
+        return jsonify({"error": "You are not a member of this group."}), 403
+
+    # Read everything the search needs here; the worker never touches the DB
+    population = _population_picks(group_id)
+    fixed = fixed_results(_build_true_results())
+    job_id, user_id = uuid.uuid4().hex, current_user.id
+    if not cache.put("autofill_job", 0, (job_id,), {"user_id": user_id, "status": "running"}, JOB_TTL):
+        return jsonify({"error": "Could not queue the autofill, try again."}), 503
+    future = _optimizer_pool.submit(
+        contrarian_bracket, population, len(population) + 1, fixed, weight, budget, seed
+    )
+    future.add_done_callback(lambda f: _store_job(job_id, user_id, f))
+
+    return jsonify({
+        "job_id":     job_id,
+        "status_url": url_for("autofill_job", job_id=job_id),
+        "budget":     budget,
+    }), 202
+
+
+@app.route("/autofill_jobs/<job_id>")
+@login_required
+def autofill_job(job_id):
+    """Poll a queued autofill: 202 while running, then the result (once)."""
+    job = cache.peek("autofill_job", 0, (job_id,))
+    if job is None or job["user_id"] != current_user.id:
+        abort(404)
+    if job["status"] == "running":
+        return jsonify({"status": "running"}), 202
+
+    cache.forget("autofill_job", 0, (job_id,))
+    if job["status"] == "failed":
+        return jsonify({"status": "failed", "error": job["error"]}), 500
+    return jsonify({"status": "done", **job["result"]})
+
+
+@app.route("/api/odds")
+def odds_api():
+    """
+    Per-team probability of reaching each round, conditioned on the results
+    entered so far. Monte Carlo by default; ?mode=exact computes it
+    analytically for ?model=simulation|seed|coin|log5.
+    """
+    # Normalised before anything is keyed or computed, so only a handful of
+    # distinct requests can ever reach the simulator
+    try:
+        weight = normalize_weight(request.args.get("weight", 0.25))
+        n_sims = snap_sims(request.args.get("sims", DEFAULT_SIMS))
+    except ValueError:
+        return jsonify({"error": "weight and sims must be finite numbers."}), 400
+
+    mode = request.args.get("mode", "monte_carlo")
+    kind = request.args.get("model", "simulation")
+    if mode not in ("monte_carlo", "exact"):
+        return jsonify({"error": "mode must be monte_carlo or exact."}), 400
+    if mode == "exact" and kind not in ("simulation", "seed", "coin", "log5"):
+        return jsonify({"error": "model must be simulation, seed, coin or log5."}), 400
+    if mode == "exact" and kind != "simulation":
+        weight = None  # only the simulation model blends by weight
+
+    def build():
+        fixed = fixed_results(_build_true_results())
+        if mode == "exact":
+            return exact_odds(kind=kind, weight=weight, fixed=fixed)
+        return advancement_odds(weight=weight, n_sims=n_sims, fixed=fixed)
+
+    # Shared by every worker until a result or the team data changes;
+    # log5 odds also follow cbb_25.csv
+    version = (results_version(), get_model().version, data_version(kind) if mode == "exact" else None)
+    parts = (mode, kind, weight) if mode == "exact" else (mode, weight, n_sims)
+    return jsonify(cache.cached("odds", version, parts, build))
+
+@app.route("/api/bracket/<int:bracket_id>/forecast")
+def bracket_forecast_api(bracket_id):
+    """Expected final score and chance of finishing first, site-wide and per group."""
+    bracket = Bracket.query.get_or_404(bracket_id)
+    forecasts = BracketForecast.query.filter_by(bracket_id=bracket.id).all()
+    return jsonify({
+        "bracket_id": bracket.id,
+        "forecasts": [
+            {
+                "group_id":        None if f.scope == GLOBAL_SCOPE else f.scope,
+                "expected_score":  f.expected_score,
+                "win_probability": f.win_probability,
+                "updated_at":      f.updated_at.isoformat(),
+            }
+            for f in forecasts
+        ]
+    })
+
 # -------------------------------------------------------
 # ADMIN HELPER: verify secret
 # -------------------------------------------------------
@@ -376,35 +596,41 @@ def _check_admin(request):
 def _build_true_results():
     """
     Returns { "west_r64": ["Florida", "Auburn", ...], ... }
-    indexed by slot, matching the bracket.js container IDs.
+    indexed by slot, matching the bracket.js container IDs. Served from
+    the per-process cache in results.py, revalidated against the DB's
+    results version.
     """
-    results = TournamentResult.query.all()
-    shaped = {}
-    for r in results:
-        if r.round_id not in shaped:
-            shaped[r.round_id] = []
-        while len(shaped[r.round_id]) <= r.slot_index:
-            shaped[r.round_id].append(None)
-        shaped[r.round_id][r.slot_index] = r.winner_name
-    return shaped
+    return true_results()
 
 
 # -------------------------------------------------------
 # ADMIN HELPER: rescore every bracket
 # -------------------------------------------------------
 def _rescore_all_brackets():
-    from scoring import score_bracket
+    """Returns (brackets scanned, scores changed, top score)."""
     true_results = _build_true_results()
     if not true_results:
-        return 0, 0
-    brackets = Bracket.query.all()
-    top = 0
-    for b in brackets:
-        b.score = score_bracket(b.bracket_data, true_results)
-        if b.score > top:
-            top = b.score
-    db.session.commit()
-    return len(brackets), top
+        return 0, 0, 0
+    return rescore_all(true_results)
+
+
+# Submissions and results queue a rescore here instead of running one inline
+_rescore_worker = RescoreWorker(app, _build_true_results, results_version)
+
+
+# -------------------------------------------------------
+# ADMIN HELPER: refresh bracket forecasts off the request
+# -------------------------------------------------------
+_forecast_lock = threading.Lock()
+
+
+def _refresh_forecasts():
+    with _forecast_lock:
+        return refresh_forecasts(fixed_results(_build_true_results()))
+
+
+# Results queue a refresh here; a burst of them shares one pass
+_forecast_worker = CoalescingWorker(app, "forecast", lambda: {"brackets": _refresh_forecasts()})
 
 
 # -------------------------------------------------------
@@ -441,11 +667,16 @@ def set_result():
     if not round_id or slot_index is None or not winner_name:
         return jsonify({"error": "round_id, slot_index, and winner_name are required."}), 400
 
+    # Bump first: the version row's lock serialises result changes, so the
+    # old winner read below is the one this change replaces
+    bump_results_version()
+
     # Upsert
     existing = TournamentResult.query.filter_by(
         round_id=round_id, slot_index=int(slot_index)
     ).first()
 
+    old_winner = existing.winner_name if existing else None
     if existing:
         existing.winner_name = winner_name
     else:
@@ -455,15 +686,107 @@ def set_result():
             winner_name=winner_name
         ))
 
+    # Only brackets that picked the old or new winner move, in this transaction
+    changed = apply_result_delta(round_id, int(slot_index), old_winner, winner_name)
     db.session.commit()
 
-    # Rescore immediately
-    brackets_scored, top_score = _rescore_all_brackets()
+    # Group scores and standings catch up in the background, or every score
+    # when the delta couldn't be applied
+    version = _rescore_worker.request(FULL_PASS if changed is None else DERIVED_PASS)
+    _forecast_worker.request()
 
     return jsonify({
-        "message": f"{winner_name} saved. {brackets_scored} bracket(s) rescored.",
-        "brackets_scored": brackets_scored,
-        "top_score": top_score
+        "message": (f"{winner_name} saved. Rescoring queued." if changed is None
+                    else f"{winner_name} saved. {changed} score(s) updated."),
+        "scores_changed": changed,
+        "rescore_version": version,
+        "results_version": results_version()
+    })
+
+
+# -------------------------------------------------------
+# ADMIN: SAVE MANY GAME RESULTS AT ONCE
+# -------------------------------------------------------
+def _parse_bulk_results(req):
+    """
+    (round_id, slot_index, winner_name) rows from a JSON array (of objects
+    or of 3-item arrays, optionally under "results") or from CSV with an
+    optional round_id,slot_index,winner_name header. Raises ValueError.
+    """
+    if req.mimetype in ("text/csv", "text/plain"):
+        rows = [r for r in csv.reader(io.StringIO(req.get_data(as_text=True))) if any(c.strip() for c in r)]
+        if rows and rows[0][0].strip().lower() == "round_id":
+            rows = rows[1:]
+    else:
+        rows = req.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get("results")
+        if not isinstance(rows, list):
+            raise ValueError("Send a JSON array of results or a text/csv body.")
+
+    parsed = []
+    for n, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            row = [row.get("round_id"), row.get("slot_index"), row.get("winner_name")]
+        if not isinstance(row, (list, tuple)) or len(row) != 3 or any(v is None for v in row):
+            raise ValueError(f"Row {n}: expected round_id, slot_index, winner_name.")
+        round_id, slot_index, winner_name = (str(v).strip() for v in row)
+        try:
+            slot_index = int(slot_index)
+        except ValueError:
+            raise ValueError(f"Row {n}: slot_index must be a number.")
+        parsed.append((round_id, slot_index, winner_name))
+    return parsed
+
+
+@app.route("/admin/set_results", methods=["POST"])
+@login_required
+def set_results():
+    if not _check_admin(request):
+        return jsonify({"error": "Unauthorized — wrong admin secret."}), 403
+
+    try:
+        rows = _parse_bulk_results(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "No results given."}), 400
+
+    problems, seen = [], set()
+    for round_id, slot_index, winner_name in rows:
+        problem = result_problem(round_id, slot_index, winner_name)
+        if problem is None and (round_id, slot_index) in seen:
+            problem = f"{round_id}[{slot_index}]: given more than once"
+        if problem:
+            problems.append(problem)
+        seen.add((round_id, slot_index))
+    if problems:
+        return jsonify({"error": "No results were saved.", "problems": problems}), 400
+
+    # Upsert every row in one transaction
+    existing = {(r.round_id, r.slot_index): r for r in TournamentResult.query.all()}
+    for round_id, slot_index, winner_name in rows:
+        result = existing.get((round_id, slot_index))
+        if result:
+            result.winner_name = winner_name
+        else:
+            db.session.add(TournamentResult(
+                round_id=round_id,
+                slot_index=slot_index,
+                winner_name=winner_name
+            ))
+    bump_results_version()
+    db.session.commit()
+
+    # One rescore pass and one forecast refresh for the whole batch
+    version = _rescore_worker.request()
+    _forecast_worker.request()
+
+    return jsonify({
+        "message": f"{len(rows)} result(s) saved. Rescoring queued.",
+        "results_saved": len(rows),
+        "rescore_version": version,
+        "results_version": results_version()
     })
 
 
@@ -476,14 +799,55 @@ def rescore():
     if not _check_admin(request):
         return jsonify({"error": "Unauthorized — wrong admin secret."}), 403
 
-    brackets_scored, top_score = _rescore_all_brackets()
+    scanned, changed, top_score = _rescore_all_brackets()
+    _rescore_worker.request(DERIVED_PASS)
+    _forecast_worker.request()
     return jsonify({
-        "message": f"{brackets_scored} bracket(s) rescored.",
-        "brackets_scored": brackets_scored,
+        "message": f"{scanned} bracket(s) rescored, {changed} score(s) changed.",
+        "brackets_scored": scanned,
+        "scores_changed": changed,
         "top_score": top_score
     })
 
 
+# -------------------------------------------------------
+# RESCORE STATUS
+# -------------------------------------------------------
+@app.route("/api/rescore_status")
+def rescore_status():
+    """Newest rescore requested, newest one finished, when scores last caught up, and the results version."""
+    return jsonify({**_rescore_worker.status(), "results_version": results_version(),
+                    "forecasts": _forecast_worker.status()})
+
+
+# -------------------------------------------------------
+# ADMIN: CACHE STATS
+# -------------------------------------------------------
+@app.route("/admin/cache_stats")
+@login_required
+def cache_stats():
+    """Shared cache backend and this worker's hits / misses / errors per key family."""
+    if not _check_admin(request):
+        return jsonify({"error": "Unauthorized — wrong admin secret."}), 403
+    return jsonify(cache.stats())
+
+
+# -------------------------------------------------------
+# ADMIN: RECOMPUTE BRACKET FORECASTS NOW
+# -------------------------------------------------------
+@app.route("/admin/refresh_forecasts", methods=["POST"])
+@login_required
+def refresh_forecasts_now():
+    if not _check_admin(request):
+        return jsonify({"error": "Unauthorized — wrong admin secret."}), 403
+
+    brackets_forecast = _refresh_forecasts()
+    return jsonify({
+        "message": f"{brackets_forecast} bracket forecast(s) refreshed.",
+        "brackets_forecast": brackets_forecast
+    })
+
+
 # -------------------------------------------------------
 # ADMIN: GET ALL LOGGED RESULTS (to populate the UI on load)
 # -------------------------------------------------------
@@ -542,6 +906,7 @@ def save_bracket():
         bracket_data=bracket_data,
         is_submitted=False
     )
+    store_picks(new_bracket)  # drafts may be incomplete, so problems aren't fatal here
     db.session.add(new_bracket)
     db.session.commit()
 
@@ -581,6 +946,10 @@ def submit_bracket():
             return jsonify({"error": "Bracket not found."}), 404
         if b.is_submitted:
             return jsonify({"error": "This bracket is already submitted."}), 400
+        problems = store_picks(b)
+        if problems:
+            db.session.rollback()
+            return jsonify({"error": "This bracket doesn't fit the tournament.", "problems": problems[:5]}), 400
         b.is_submitted  = True
         b.entry_number  = entry_number
         b.bracket_name  = bracket_name
@@ -597,11 +966,14 @@ def submit_bracket():
             bracket_data=bracket_data,
             is_submitted=True
         )
+        problems = store_picks(b)
+        if problems:
+            return jsonify({"error": "This bracket doesn't fit the tournament.", "problems": problems[:5]}), 400
         db.session.add(b)
         db.session.commit()
 
-    # Rescore immediately so submitted bracket gets a score
-    _rescore_all_brackets()
+    # The submitted bracket is scored by the next background pass
+    _rescore_worker.request()
 
     return jsonify({"message": "Bracket submitted!", "bracket_id": b.id})
 
@@ -0,0 +1,106 @@
+import json
+import threading
+from collections import deque
+
+from simulation import STRATEGY_RULES, bracket_payload, get_model, play_brackets
+
+# ---------------------------------------
+# PRE-GENERATED AUTOFILL POOL
+# ---------------------------------------
+# Random strategies are served from per-(strategy, weight bucket) ring
+# buffers of ready-to-send JSON brackets. A request pops one; a background
+# thread refills any buffer that drops below LOW_WATER, a whole batch at a
+# time through the vectorized bracket engine.
+
+POOLED_STRATEGIES = {"simulation", "random", "probabilistic (by seed)"}
+WEIGHTED_STRATEGIES = {"simulation"}
+
+CAPACITY     = 512
+LOW_WATER    = 128
+WEIGHT_STEP  = 0.05
+
+_pools = {}
+_pools_lock = threading.Lock()
+_refill_needed = threading.Event()
+_worker = None
+
+
+def pool_key(strategy, weight):
+    """(strategy, weight bucket); weights snap to the nearest WEIGHT_STEP."""
+    if strategy not in WEIGHTED_STRATEGIES:
+        return strategy, None
+    weight = min(max(float(weight), 0.0), 1.0)
+    return strategy, round(round(weight / WEIGHT_STEP) * WEIGHT_STEP, 2)
+
+
+def _fill(key):
+    strategy, weight = key
+    pool = _pools[key]
+    n = CAPACITY - len(pool)
+    if n <= 0:
+        return
+    model = get_model()
+    rule = STRATEGY_RULES[strategy](0.25 if weight is None else weight)
+    field, winners = play_brackets(rule, n, model)
+    pool.extend(
+        (model.version, json.dumps(bracket_payload(f, w, model)))
+        for f, w in zip(field, winners)
+    )
+
+
+def _refill_loop():
+    while True:
+        _refill_needed.wait()
+        _refill_needed.clear()
+        for key in list(_pools):
+            if len(_pools[key]) < LOW_WATER:
+                try:
+                    _fill(key)
+                except Exception as e:
+                    print("Autofill pool refill error:", e)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        with _pools_lock:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(target=_refill_loop, name="autofill-pool", daemon=True)
+                _worker.start()
+
+
+def warm(keys):
+    """Create pools for the given (strategy, weight) pairs and start filling them."""
+    for strategy, weight in keys:
+        key = pool_key(strategy, weight)
+        with _pools_lock:
+            _pools.setdefault(key, deque(maxlen=CAPACITY))
+    _ensure_worker()
+    _refill_needed.set()
+
+
+def take(strategy, weight):
+    """
+    Pop a pre-simulated bracket as a JSON string, or None when the strategy
+    isn't pooled or its buffer is momentarily empty (the caller then builds
+    one directly).
+    """
+    if strategy not in POOLED_STRATEGIES:
+        return None
+    key = pool_key(strategy, weight)
+    pool = _pools.get(key)
+    if pool is None:
+        warm([(strategy, weight)])
+        return None
+    try:
+        version, bracket = pool.popleft()
+    except IndexError:
+        version, bracket = None, None
+    if version is not None and version != get_model().version:
+        # team data changed since these were drawn
+        pool.clear()
+        bracket = None
+    if len(pool) < LOW_WATER:
+        _ensure_worker()
+        _refill_needed.set()
+    return bracket
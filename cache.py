@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# ---------------------------------------
+# SHARED CACHE
+# ---------------------------------------
+# gunicorn runs several worker processes, so anything cached in one
+# process's memory is rebuilt, and can drift, in every other. Values that
+# are expensive or read on every page view go through one cache backend
+# chosen by CACHE_URL:
+#
+#   unset                   LocalCache: this process only (the fallback)
+#   sqlite:///path/file.db  SQLiteCache: a file shared by every worker on
+#                           the host
+#   redis://host:port/0     RedisCache: any Redis-protocol server (needs
+#                           the redis package, an optional requirement
+#                           left commented out in requirements.txt)
+#
+# Values are JSON. Keys are "family:version:parts"; the version is whatever
+# the value depends on (results version, model version), so a new version
+# simply stops matching old keys, and TTL bounds everything else. Each
+# family counts its hits and misses per process. cached() is read-through;
+# peek/put/forget store values that are produced elsewhere (job results).
+
+DEFAULT_TTL = 300
+LOCAL_MAX_ENTRIES = 512
+SQLITE_PURGE_EVERY = 256
+
+
+class LocalCache:
+    """In-process LRU with per-entry expiry."""
+    name = "local"
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteCache:
+    """A SQLite file every process on the host shares; one connection per thread."""
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, json.dumps(value), now + ttl))
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisCache:
+    """Any Redis-protocol server; expiry is left to the server."""
+    name = "redis"
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for a redis:// CACHE_URL
+        self._client = redis.Redis.from_url(url, socket_timeout=1)
+
+    def get(self, key):
+        value = self._client.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def from_url(url):
+    """The backend for a CACHE_URL (see above); LocalCache when it is empty."""
+    if not url:
+        return LocalCache()
+    if url.startswith("sqlite:///"):
+        return SQLiteCache(url[len("sqlite:///"):] or os.path.join(tempfile.gettempdir(), "bracket-cache.db"))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0, "errors": 0})
+_stats_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = from_url(os.environ.get("CACHE_URL", ""))
+    return _backend
+
+
+def _count(family, outcome):
+    with _stats_lock:
+        _stats[family][outcome] += 1
+
+
+def cache_key(family, version, *parts):
+    return ":".join(str(p) for p in (family, version, *parts))
+
+
+def cached(family, version, parts, build, ttl=DEFAULT_TTL):
+    """
+    The cached value for (family, version, *parts), or build()'s result,
+    stored for ttl seconds. build() must return JSON-serialisable data
+    (tuples come back as lists). A failing backend counts an error and
+    falls through to build().
+    """
+    key = cache_key(family, version, *parts)
+    backend = get_backend()
+    try:
+        value = backend.get(key)
+    except Exception as e:
+        print("Cache read error:", e)
+        _count(family, "errors")
+        return build()
+
+    if value is not None:
+        _count(family, "hits")
+        return value
+
+    _count(family, "misses")
+    value = build()
+    try:
+        backend.set(key, value, ttl)
+    except Exception as e:
+        print("Cache write error:", e)
+        _count(family, "errors")
+    return value
+
+
+def peek(family, version, parts):
+    """The stored value for (family, version, *parts), or None; never builds."""
+    try:
+        value = get_backend().get(cache_key(family, version, *parts))
+    except Exception as e:
+        print("Cache read error:", e)
+        _count(family, "errors")
+        return None
+    _count(family, "misses" if value is None else "hits")
+    return value
+
+
+def put(family, version, parts, value, ttl=DEFAULT_TTL):
+    """Store value under (family, version, *parts) for ttl seconds; False if the backend failed."""
+    try:
+        get_backend().set(cache_key(family, version, *parts), value, ttl)
+    except Exception as e:
+        print("Cache write error:", e)
+        _count(family, "errors")
+        return False
+    return True
+
+
+def forget(family, version, parts):
+    """Drop (family, version, *parts) before its TTL runs out."""
+    try:
+        get_backend().delete(cache_key(family, version, *parts))
+    except Exception as e:
+        print("Cache write error:", e)
+        _count(family, "errors")
+
+
+def stats():
+    """{ "backend", "pid", "families": { family: {hits, misses, errors} } } for this process."""
+    with _stats_lock:
+        families = {family: dict(counts) for family, counts in sorted(_stats.items())}
+    return {"backend": get_backend().name, "pid": os.getpid(), "families": families}
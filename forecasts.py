@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from models import db, Bracket, BracketForecast, GroupBracketSelection
+from picks import load_picks
+from scoring import outcome_matrix, pick_matrix, score_matrix
+from simulation import advancement_probabilities, get_model, simulate_tournaments
+
+# ---------------------------------------
+# BRACKET FORECASTS
+# ---------------------------------------
+
+GLOBAL_SCOPE = 0
+DEFAULT_SIMS = 5_000
+SIM_CHUNK    = 1_000
+CHUNK_BYTES  = 256 * 2**20  # working memory for one chunk of simulations
+CELL_BYTES   = 24           # per (bracket, simulation): float32 product, int64 score, top flags
+
+
+def sim_chunk(n_brackets):
+    """Simulations to score at once so a chunk stays near CHUNK_BYTES."""
+    return int(min(SIM_CHUNK, max(1, CHUNK_BYTES // (max(n_brackets, 1) * CELL_BYTES))))
+
+
+def forecast(picks, scopes, fixed, weight=0.25, n_sims=DEFAULT_SIMS, seed=None):
+    """
+    Expected score and chance of finishing first for a set of brackets.
+
+    picks   (brackets, 63) team ids, as scoring.bracket_picks
+    scopes  { scope: array of row indices into picks competing together }
+    fixed   simulation.fixed_results for the games already played
+
+    Expected scores are exact: each pick is worth its points times the
+    conditional probability that team wins that game. Win probabilities
+    come from scoring every bracket against n_sims conditional simulations
+    at once, a chunk of simulations at a time sized by sim_chunk so memory
+    stays flat as the bracket count grows; a tie for first splits the win
+    evenly.
+
+    Returns (expected (brackets,), { scope: win probability per row }).
+    """
+    model = get_model()
+    n_teams = len(model.names)
+    picks_mat = pick_matrix(picks, model.team_line, n_teams)
+
+    advance = advancement_probabilities("simulation", weight, fixed)
+    expected = picks_mat @ advance.T.ravel().astype(np.float32)
+
+    _, outcomes = simulate_tournaments(n_sims, weight=weight, seed=seed, fixed=fixed)
+    wins = {scope: np.zeros(len(rows)) for scope, rows in scopes.items()}
+    chunk = sim_chunk(len(picks_mat))
+    for start in range(0, n_sims, chunk):
+        scores = score_matrix(picks_mat, outcome_matrix(outcomes[start:start + chunk], model.team_line, n_teams))
+        for scope, rows in scopes.items():
+            if not len(rows):
+                continue
+            # A scope of every bracket (site-wide) scores in place, without a copy
+            field = scores if len(rows) == len(scores) else scores[rows]
+            is_top = field == field.max(axis=0)
+            wins[scope] += is_top.astype(np.float32) @ (1.0 / is_top.sum(axis=0)).astype(np.float32)
+        del scores
+
+    return expected.astype(float), {scope: w / n_sims for scope, w in wins.items()}
+
+
+def refresh_forecasts(fixed, weight=0.25, n_sims=DEFAULT_SIMS, seed=None):
+    """
+    Recompute and store forecasts for every submitted bracket, site-wide and
+    within each group it is entered in. Returns the number of brackets.
+    """
+    ids, picks = load_picks(Bracket.query.filter(Bracket.is_submitted.is_(True)))
+    position = {bid: i for i, bid in enumerate(ids)}
+
+    scopes = {GLOBAL_SCOPE: np.arange(len(ids))}
+    for group_id, bracket_id in (GroupBracketSelection.query
+                                 .with_entities(GroupBracketSelection.group_id, GroupBracketSelection.bracket_id)
+                                 .all()):
+        if bracket_id in position:
+            scopes.setdefault(group_id, []).append(position[bracket_id])
+    scopes = {scope: np.unique(np.asarray(r, dtype=np.int64)) for scope, r in scopes.items()}
+
+    if len(ids):
+        expected, wins = forecast(picks, scopes, fixed, weight, n_sims, seed)
+    else:
+        expected, wins = np.zeros(0), {}
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    BracketForecast.query.delete()
+    db.session.bulk_insert_mappings(BracketForecast, [
+        {
+            "scope": scope,
+            "bracket_id": int(ids[row]),
+            "expected_score": float(expected[row]),
+            "win_probability": float(p),
+            "updated_at": now,
+        }
+        for scope, probs in wins.items()
+        for row, p in zip(scopes[scope], probs)
+    ])
+    db.session.commit()
+    return len(ids)
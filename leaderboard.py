@@ -0,0 +1,132 @@
+from forecasts import GLOBAL_SCOPE
+from models import db, Bracket, Group, GroupBracketSelection, GroupMembership, GroupScore, Standing, User
+
+# ---------------------------------------
+# LEADERBOARD PAGES
+# ---------------------------------------
+# The leaderboard is read a page at a time in (score desc, id asc) order
+# with keyset pagination: a page continues strictly after the last row of
+# the one before, found through the ix_bracket_leaderboard index, so deep
+# pages cost the same as the first. Only the columns the leaderboard shows
+# are selected, joined to the username and the stored site-wide Standing
+# in the same query.
+#
+# A cursor is "score:id:position" of the last row served; position is its
+# place on the board, so pages never need to count the rows above them.
+
+PAGE_SIZE     = 100
+MAX_PAGE_SIZE = 500
+
+
+def _cursor(row, position):
+    return f"{row.score}:{row.id}:{position}"
+
+
+def parse_cursor(cursor):
+    """(score, id, position) from a cursor string; raises ValueError."""
+    score, bracket_id, position = (int(v) for v in cursor.split(":"))
+    return score, bracket_id, position
+
+
+def leaderboard_page(after=None, limit=PAGE_SIZE):
+    """
+    One page of submitted brackets, best first.
+
+    after  cursor of the last row already shown, or None for the top
+    limit  rows per page, capped at MAX_PAGE_SIZE
+
+    Returns (entries, next cursor or None). Each entry is a dict of
+    position, rank, previous_rank, id, bracket_name, entry_number, score
+    and username; rank is the position until standings first cover it.
+    """
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    query = (db.session.query(Bracket.id, Bracket.bracket_name, Bracket.entry_number,
+                              Bracket.score, User.username, Standing.rank, Standing.previous_rank)
+             .join(User, User.id == Bracket.user_id)
+             .outerjoin(Standing, (Standing.scope == GLOBAL_SCOPE) & (Standing.bracket_id == Bracket.id))
+             .filter(Bracket.is_submitted.is_(True)))
+
+    position = 0
+    if after:
+        score, bracket_id, position = parse_cursor(after)
+        query = query.filter(db.or_(Bracket.score < score,
+                                    db.and_(Bracket.score == score, Bracket.id > bracket_id)))
+
+    # One extra row says whether there is a next page
+    rows = query.order_by(Bracket.score.desc(), Bracket.id.asc()).limit(limit + 1).all()
+    entries = [
+        {
+            "position":      position + k + 1,
+            "rank":          row.rank or position + k + 1,
+            "previous_rank": row.previous_rank,
+            "id":            row.id,
+            "bracket_name":  row.bracket_name,
+            "entry_number":  row.entry_number,
+            "score":         row.score,
+            "username":      row.username,
+        }
+        for k, row in enumerate(rows[:limit])
+    ]
+    next_cursor = _cursor(rows[limit - 1], position + limit) if len(rows) > limit else None
+    return entries, next_cursor
+
+
+# ---------------------------------------
+# MY GROUPS
+# ---------------------------------------
+
+def my_group_entries(user_id):
+    """
+    Every group a user belongs to, in the order they joined, with the
+    user's selected brackets ranked within the group, from one query.
+
+    Ranks are RANK() over each group's selected, submitted brackets by
+    group score (GroupScore, falling back to Bracket.score until one is
+    stored) then tiebreak, so tied brackets share a rank. Returns a list of
+    { "group": {id, name}, "my_entries": [({id, bracket_name, score}, rank)],
+    "total_entries": n }.
+    """
+    my_groups = (db.session.query(GroupMembership.group_id)
+                 .filter(GroupMembership.user_id == user_id))
+    score = db.func.coalesce(GroupScore.score, Bracket.score)
+    ranked = (db.session.query(
+                  GroupBracketSelection.group_id,
+                  GroupBracketSelection.user_id,
+                  Bracket.id.label("bracket_id"),
+                  Bracket.bracket_name,
+                  score.label("score"),
+                  db.func.rank().over(
+                      partition_by=GroupBracketSelection.group_id,
+                      order_by=(score.desc(), db.func.coalesce(GroupScore.tiebreak, 0).desc()),
+                  ).label("rank"),
+                  db.func.count().over(partition_by=GroupBracketSelection.group_id).label("total"))
+              .join(Bracket, Bracket.id == GroupBracketSelection.bracket_id)
+              .outerjoin(GroupScore, (GroupScore.group_id == GroupBracketSelection.group_id)
+                         & (GroupScore.bracket_id == Bracket.id))
+              .filter(Bracket.is_submitted.is_(True))
+              .filter(GroupBracketSelection.group_id.in_(my_groups))
+              .subquery())
+    totals = (db.session.query(ranked.c.group_id, db.func.max(ranked.c.total).label("total"))
+              .group_by(ranked.c.group_id)
+              .subquery())
+
+    rows = (db.session.query(Group.id, Group.name, db.func.coalesce(totals.c.total, 0),
+                             ranked.c.bracket_id, ranked.c.bracket_name, ranked.c.score, ranked.c.rank)
+            .select_from(GroupMembership)
+            .join(Group, Group.id == GroupMembership.group_id)
+            .outerjoin(totals, totals.c.group_id == Group.id)
+            .outerjoin(ranked, (ranked.c.group_id == Group.id) & (ranked.c.user_id == user_id))
+            .filter(GroupMembership.user_id == user_id)
+            .order_by(GroupMembership.id, ranked.c.rank, ranked.c.bracket_id)
+            .all())
+
+    groups = {}
+    for group_id, name, total, bracket_id, bracket_name, score, rank in rows:
+        entry = groups.setdefault(group_id, {
+            "group": {"id": group_id, "name": name},
+            "my_entries": [],
+            "total_entries": total,
+        })
+        if bracket_id is not None:
+            entry["my_entries"].append(({"id": bracket_id, "bracket_name": bracket_name, "score": score}, rank))
+    return list(groups.values())
@@ -19,6 +19,21 @@ class Bracket(db.Model):
 
     user = db.relationship('User', backref='brackets')
 
+# Leaderboard order, for keyset pages (leaderboard.leaderboard_page)
+db.Index('ix_bracket_leaderboard', Bracket.is_submitted, Bracket.score.desc(), Bracket.id)
+
+class BracketPicks(db.Model):
+    """Canonical picks of a bracket, derived from bracket_data when it is saved.
+      picks = 63 bytes, one per game in simulation.GAME_SLOTS order: the picked
+              winner's team id (index into TEAMS), 254 for a name that isn't
+              a team (e.g. an unresolved "A / B" First Four line), 255 for no pick
+    """
+    bracket_id = db.Column(db.Integer, db.ForeignKey('bracket.id'), primary_key=True)
+    picks      = db.Column(db.LargeBinary(63), nullable=False)
+
+    bracket = db.relationship('Bracket', backref=db.backref(
+        'compact_picks', uselist=False, cascade='all, delete-orphan'))
+
 class TournamentResult(db.Model):
     """Stores each official game winner by round container ID and slot index.
     This mirrors the bracket.js structure exactly:
@@ -35,6 +50,14 @@ class TournamentResult(db.Model):
         db.UniqueConstraint('round_id', 'slot_index', name='uq_round_slot'),
     )
 
+class TournamentState(db.Model):
+    """Single row (id 1) of tournament-wide counters.
+      results_version = bumped with every change to TournamentResult, so
+                        cached results can be revalidated cheaply (results.py)
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    results_version = db.Column(db.Integer, nullable=False, default=0)
+
 class Group(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
@@ -45,6 +68,38 @@ class Group(db.Model):
     owner = db.relationship('User', backref='owned_groups', foreign_keys=[owner_id])
 
 
+class GroupScoringRules(db.Model):
+    """A group's own scoring; groups without a row use the standard 1-2-4-8-16-32.
+      round_points = JSON list of 6 points per correct pick, Round of 64 first
+      upset_bonus  = extra points per seed line a correctly picked winner was
+                     seeded below the team it beat
+      tiebreaker   = one of scoring.TIEBREAKERS
+    """
+    group_id     = db.Column(db.Integer, db.ForeignKey('group.id'), primary_key=True)
+    round_points = db.Column(db.JSON, nullable=False)
+    upset_bonus  = db.Column(db.Integer, nullable=False, default=0)
+    tiebreaker   = db.Column(db.String(20), nullable=False, default='none')
+
+    group = db.relationship('Group', backref=db.backref(
+        'scoring_rules', uselist=False, cascade='all, delete-orphan'))
+
+
+class GroupScore(db.Model):
+    """Score of a bracket selected into a group under that group's rules,
+    refreshed by rescoring.refresh_group_scores.
+      tiebreak = orders tied scores, higher first (scoring.tiebreak_weights)
+    """
+    id         = db.Column(db.Integer, primary_key=True)
+    group_id   = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
+    bracket_id = db.Column(db.Integer, db.ForeignKey('bracket.id'), nullable=False)
+    score      = db.Column(db.Integer, nullable=False, default=0)
+    tiebreak   = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'bracket_id', name='uq_group_score_bracket'),
+    )
+
+
 class GroupMembership(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
@@ -70,4 +125,44 @@ class GroupBracketSelection(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('group_id', 'user_id', 'bracket_id', name='uq_group_user_bracket'),
-    )
\ No newline at end of file
+    )
+
+
+class BracketForecast(db.Model):
+    """Projected outcome of a submitted bracket, refreshed whenever results change.
+      scope           = 0 for the whole site, otherwise the Group id
+      expected_score  = expected final score under scoring.score_bracket
+      win_probability = chance of finishing first in that scope (ties split)
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.Integer, nullable=False, default=0)
+    bracket_id = db.Column(db.Integer, db.ForeignKey('bracket.id'), nullable=False)
+    expected_score = db.Column(db.Float, nullable=False)
+    win_probability = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    bracket = db.relationship('Bracket', backref='forecasts')
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'bracket_id', name='uq_forecast_scope_bracket'),
+    )
+
+
+class Standing(db.Model):
+    """Rank of a submitted bracket, refreshed by rescoring.refresh_standings.
+      scope         = 0 for the whole site, otherwise the Group id
+      score         = the bracket's score in that scope (the group's rules in a group)
+      rank          = RANK() by score, then tiebreak in a group; ties share a rank
+      previous_rank = rank before it last moved, None until it has
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.Integer, nullable=False, default=0)
+    bracket_id = db.Column(db.Integer, db.ForeignKey('bracket.id'), nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    rank = db.Column(db.Integer, nullable=False)
+    previous_rank = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'bracket_id', name='uq_standing_scope_bracket'),
+        db.Index('ix_standing_scope_rank', 'scope', 'rank'),
+    )
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from simulation import get_model, simulate_tournaments, advancement_probabilities, N_GAMES, REGIONS, ROUND_STARTS
+
+# ---------------------------------------
+# ROUND-ADVANCEMENT ODDS
+# ---------------------------------------
+
+# Winning round k of ROUND_KEYS means reaching ODDS_ROUNDS[k]
+ODDS_ROUNDS = ["r32", "s16", "e8", "f4", "final", "champion"]
+
+DEFAULT_SIMS = 50_000
+MAX_SIMS     = 500_000
+CACHE_SIZE   = 32
+
+# Simulation counts /api/odds offers; any other request snaps down to one
+SIM_STEPS = (10_000, DEFAULT_SIMS, 100_000)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def normalize_weight(weight):
+    """weight clamped to [0, 1] and rounded to 3 decimals; raises ValueError if it isn't finite."""
+    weight = float(weight)
+    if not np.isfinite(weight):
+        raise ValueError("weight must be a finite number")
+    return round(min(max(weight, 0.0), 1.0), 3)
+
+
+def snap_sims(n_sims):
+    """The largest of SIM_STEPS not above n_sims, or the smallest."""
+    n_sims = int(n_sims)
+    return max([step for step in SIM_STEPS if step <= n_sims], default=SIM_STEPS[0])
+
+
+def _advancement_table(winners, n_teams):
+    """(n_teams, rounds) fraction of simulations in which each team won each round."""
+    table = np.empty((n_teams, len(ODDS_ROUNDS)))
+    for round_idx in range(len(ODDS_ROUNDS)):
+        games = winners[:, ROUND_STARTS[round_idx]:ROUND_STARTS[round_idx + 1]]
+        table[:, round_idx] = np.bincount(games.ravel(), minlength=n_teams)
+    return table / len(winners)
+
+
+def _odds_payload(model, table, weight, n_sims, fixed, method="monte_carlo"):
+    teams = []
+    for team_id, name in enumerate(model.names):
+        entry = {
+            "name":   name,
+            "seed":   int(model.seeds[team_id]),
+            "region": REGIONS[model.regions[team_id]],
+        }
+        entry.update({key: float(p) for key, p in zip(ODDS_ROUNDS, table[team_id])})
+        teams.append(entry)
+    teams.sort(key=lambda t: (-t["champion"], -t["final"], -t["f4"], t["name"]))
+    return {
+        "method":        method,
+        "weight":        weight,
+        "n_sims":        n_sims,
+        "games_decided": int((np.asarray(fixed) >= 0).sum()),
+        "rounds":        ODDS_ROUNDS,
+        "teams":         teams,
+    }
+
+
+def advancement_odds(weight=0.25, n_sims=DEFAULT_SIMS, seed=None, fixed=None):
+    """
+    Probability of every team reaching each round, from n_sims batch
+    simulations of the simulate_tournament model at the given weight.
+    `fixed` (simulation.fixed_results) conditions on games already played,
+    so only the rest of the tournament is simulated.
+
+    Results are memoized per (model version, results, weight, n_sims, seed)
+    and the least recently used entries are evicted beyond CACHE_SIZE, so a
+    newly entered result costs exactly one recomputation.
+    """
+    model = get_model()
+    weight = normalize_weight(weight)
+    n_sims = min(max(int(n_sims), 1), MAX_SIMS)
+    fixed = np.full(N_GAMES, -1) if fixed is None else np.asarray(fixed)
+    key = (model.version, fixed.tobytes(), weight, n_sims, seed)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    _, winners = simulate_tournaments(n_sims, weight=weight, seed=seed, fixed=fixed)
+    payload = _odds_payload(model, _advancement_table(winners, len(model.names)), weight, n_sims, fixed)
+
+    with _cache_lock:
+        _cache[key] = payload
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return payload
+
+
+def exact_odds(kind="simulation", weight=0.25, fixed=None):
+    """
+    Same payload as advancement_odds, but computed analytically over the
+    bracket tree for the "simulation", "seed", "coin" or "log5" model (see
+    win_probability). The numbers are noise-free and cached per model
+    version and set of results.
+    """
+    model = get_model()
+    weight = normalize_weight(weight) if kind == "simulation" else None
+    fixed = np.full(N_GAMES, -1) if fixed is None else np.asarray(fixed)
+    table = advancement_probabilities(kind, weight, fixed)
+    return _odds_payload(model, table, weight, None, fixed, method=kind)
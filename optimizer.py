@@ -0,0 +1,249 @@
+import time
+
+import numpy as np
+
+from scoring import GAME_POINTS, outcome_matrix, pick_matrix, score_matrix
+from simulation import (
+    get_model, make_rng, advancement_probabilities, bracket_payload, play_brackets, simulate_tournaments,
+    FIRST_FOUR, GAME_CHILDREN, GAME_ROUND, N_GAMES, ROUND_KEYS, ROUND_STARTS,
+)
+from win_probability import win_probabilities
+
+# ---------------------------------------
+# EXPECTED-SCORE OPTIMAL BRACKET
+# ---------------------------------------
+# A pick for a round-r game scores that round's points exactly when the team
+# wins round r, so a bracket's expected score is the sum of its picks'
+# advancement probabilities times their points. Picks must be
+# consistent (a team picked in round r was picked to win its round r - 1
+# game), which makes the best bracket a max-sum over the bracket tree.
+
+POINTS_BY_ROUND = GAME_POINTS[ROUND_STARTS[:-1]]
+
+
+def optimal_picks(adv, team_line):
+    """
+    Best consistent bracket for a (teams, rounds) advancement table.
+
+    Returns (winners, value): winners is the (63,) picked winner of every
+    game, indexed as GAME_SLOTS, and value is its expected score.
+    """
+    # value[t]: best expected score of the subtree below t's round-r game,
+    # given t is picked to win it
+    value = POINTS_BY_ROUND[0] * adv[:, 0]
+    best = []  # per round, best team for each game of that round
+    for round_idx in range(len(ROUND_KEYS)):
+        if round_idx:
+            child = team_line >> round_idx
+            top = np.full(child.max() + 1, -np.inf)
+            np.maximum.at(top, child, value)
+            value = POINTS_BY_ROUND[round_idx] * adv[:, round_idx] + value + top[child ^ 1]
+        game = team_line >> (round_idx + 1)
+        order = np.lexsort((-value, game))  # best team first within each game
+        first = np.r_[True, game[order][1:] != game[order][:-1]]
+        best.append((order[first], value))
+
+    # Walk back down: each game's winner also won the feeding game on its
+    # side; the other feeding game goes to that game's own best team
+    winners = np.empty(N_GAMES, dtype=np.int64)
+    winners[-1] = best[-1][0][0]
+    for g in range(N_GAMES - 1, ROUND_STARTS[1] - 1, -1):
+        round_idx = GAME_ROUND[g]
+        side = team_line[winners[g]] >> round_idx
+        for c in GAME_CHILDREN[g]:
+            k = c - ROUND_STARTS[round_idx - 1]
+            winners[c] = winners[g] if k == side else best[round_idx - 1][0][k]
+    return winners, float(best[-1][1][winners[-1]])
+
+
+def expected_score(winners, adv):
+    """Exact expected score of a (63,) bracket under an advancement table."""
+    return float((POINTS_BY_ROUND[GAME_ROUND] * adv[winners, GAME_ROUND]).sum())
+
+
+def _payload(model, winners, adv):
+    # A line's team is its Round of 64 pick if any, else its likelier play-in team
+    field = model.lines[:, 0].copy()
+    play_in = model.lines[:, 1] >= 0
+    second = play_in & (adv[model.lines[:, 1], 0] > adv[model.lines[:, 0], 0])
+    field[second] = model.lines[second, 1]
+    for team_id in winners[:ROUND_STARTS[1]]:
+        field[model.team_line[team_id]] = team_id
+    return bracket_payload(field, winners, model)
+
+
+def optimal_bracket(weight=0.25, fixed=None, kind="simulation"):
+    """
+    Autofill payload for the bracket with the highest expected score, built
+    from the cached exact advancement probabilities. `fixed`, from
+    simulation.fixed_results(), conditions on games already played.
+    """
+    model = get_model()
+    adv = advancement_probabilities(kind, weight, fixed)
+    winners, _ = optimal_picks(adv, model.team_line)
+    return _payload(model, winners, adv)
+
+
+# ---------------------------------------
+# CONTRARIAN (POOL-AWARE) BRACKET
+# ---------------------------------------
+# In a big pool the goal is finishing first, not scoring well on average.
+# The other entrants are modelled from how often the submitted brackets
+# pick each team in each round; candidate brackets are scored against
+# simulated tournaments alongside simulated opponent fields, and the one
+# that finishes first most often within the time budget wins.
+
+DEFAULT_BUDGET = 5.0
+MAX_BUDGET     = 30.0
+N_SIMS         = 2_000
+N_OPPONENTS    = 2_000
+BATCH          = 256
+
+
+def pick_frequencies(picks, n_teams):
+    """(rounds, teams) share of brackets picking each team to win its round's game."""
+    picks = np.asarray(picks, dtype=np.int64).reshape(-1, N_GAMES)
+    freq = np.zeros((len(ROUND_KEYS), n_teams))
+    rows, games = np.nonzero(picks >= 0)
+    np.add.at(freq, (GAME_ROUND[games], picks[rows, games]), 1)
+    return freq / max(len(picks), 1)
+
+
+def population_rule(freq, smoothing=1e-3):
+    """
+    Pick rule mimicking a population: team1 is picked over team2 in
+    proportion to how often each is picked to win that round. The First
+    Four isn't scored, so it is a coin flip.
+    """
+    def rule(model, team1, team2, round_idx, rng):
+        if round_idx == FIRST_FOUR:
+            return np.where(rng.random(team1.shape) < 0.5, team1, team2)
+        a = freq[round_idx, team1] + smoothing
+        b = freq[round_idx, team2] + smoothing
+        return np.where(rng.random(team1.shape) < a / (a + b), team1, team2)
+    return rule
+
+
+def tempered_rule(kind, weight, temperature):
+    """Play from win_probabilities sharpened toward favourites as temperature -> 0."""
+    def rule(model, team1, team2, round_idx, rng):
+        p = win_probabilities(model, kind, weight)[round_idx + 1, team1, team2]
+        p, q = p ** (1 / temperature), (1 - p) ** (1 / temperature)
+        return np.where(rng.random(p.shape) < p / (p + q), team1, team2)
+    return rule
+
+
+def neighbour_rule(winners, n_teams, keep, rule):
+    """Copy each pick of `winners` with probability `keep`, else defer to `rule`."""
+    picked = np.zeros((len(ROUND_KEYS), n_teams), dtype=bool)
+    picked[GAME_ROUND, winners] = True
+
+    def neighbour(model, team1, team2, round_idx, rng):
+        drawn = rule(model, team1, team2, round_idx, rng)
+        if round_idx == FIRST_FOUR:
+            return drawn
+        pick = np.where(picked[round_idx, team1], team1, np.where(picked[round_idx, team2], team2, drawn))
+        return np.where(rng.random(team1.shape) < keep, pick, drawn)
+    return neighbour
+
+
+def _field_best(opp_scores, n, rng):
+    """
+    Best score among n opponents drawn with replacement from each row of
+    (sims, opponents) scores, and how many of them reach it, sampled from
+    the exact distribution of the field's maximum instead of drawing the
+    field: memory and time don't grow with the pool.
+    """
+    sims, m = opp_scores.shape
+    rows = np.arange(sims)
+    ranked = np.sort(opp_scores, axis=1)
+
+    # P(max <= k-th smallest) = (k / m) ** n
+    k = np.clip(np.ceil(m * rng.random(sims) ** (1.0 / n)).astype(np.int64), 1, m)
+    best = ranked[rows, k - 1]
+
+    # Given the max, each draw reaching it is Bernoulli(q) and at least one
+    # does: the first such draw is a truncated geometric J, the rest binomial
+    at = (ranked == best[:, None]).sum(axis=1)
+    q = at / (ranked <= best[:, None]).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u = rng.random(sims) * -np.expm1(n * np.log1p(-q))
+        first = np.where(q < 1, np.ceil(np.log1p(-u) / np.log1p(-q)), 1)
+    first = np.clip(np.nan_to_num(first, nan=1.0), 1, n).astype(np.int64)
+    n_tied = 1 + rng.binomial(n - first, q)
+    return best, n_tied
+
+
+def _win_share(scores, best_opp, n_tied):
+    """Chance each candidate finishes first; a tie for first splits it evenly."""
+    share = np.where(scores > best_opp, 1.0, np.where(scores == best_opp, 1 / (n_tied + 1), 0.0))
+    return share.mean(axis=1)
+
+
+def contrarian_search(population, field_size=None, fixed=None, weight=0.25,
+                      budget=DEFAULT_BUDGET, seed=None):
+    """
+    Search for the bracket most likely to finish first against a pool.
+
+    population  (brackets, 63) team ids of the submitted brackets the pool
+                is modelled on, as scoring.bracket_picks; may be empty
+    field_size  entrants including this bracket; defaults to the population
+                plus one
+    budget      seconds to spend sampling candidates
+
+    Returns (winners, win_probability, expected_score, n_candidates).
+    """
+    model = get_model()
+    rng = make_rng(seed)
+    team_line, n_teams = model.team_line, len(model.names)
+    deadline = time.monotonic() + min(max(float(budget), 0.0), MAX_BUDGET)
+
+    population = np.asarray(population, dtype=np.int64).reshape(-1, N_GAMES)
+    field_size = max(int(field_size or len(population) + 1), 2)
+    adv = advancement_probabilities("simulation", weight, fixed)
+    # With nobody to learn from, assume the pool picks like the model
+    freq = pick_frequencies(population, n_teams) if len(population) else adv.T
+
+    _, outcomes = simulate_tournaments(N_SIMS, weight=weight, seed=rng, fixed=fixed)
+    outcome_mat = outcome_matrix(outcomes, team_line, n_teams)
+
+    # Entrants filled their brackets before any results, so the field is not conditioned
+    _, opponents = play_brackets(population_rule(freq), N_OPPONENTS, model, rng)
+    opp_scores = score_matrix(pick_matrix(opponents, team_line, n_teams), outcome_mat).T
+    best_opp, n_tied = _field_best(opp_scores, field_size - 1, rng)
+
+    def evaluate(cands):
+        scores = score_matrix(pick_matrix(cands, team_line, n_teams), outcome_mat)
+        return _win_share(scores, best_opp, n_tied)
+
+    best, _ = optimal_picks(adv, team_line)
+    best_p = evaluate(best[None, :])[0]
+    n_candidates = 1
+    while time.monotonic() < deadline:
+        explore = tempered_rule("simulation", weight, rng.uniform(0.2, 1.0))
+        rule = neighbour_rule(best, n_teams, rng.uniform(0.5, 0.95), explore) if rng.random() < 0.5 else explore
+        _, cands = play_brackets(rule, BATCH, model, rng, fixed)
+        p = evaluate(cands)
+        n_candidates += len(cands)
+        if p.max() > best_p:
+            best, best_p = cands[p.argmax()], p.max()
+
+    return best, float(best_p), expected_score(best, adv), n_candidates
+
+
+def contrarian_bracket(population, field_size=None, fixed=None, weight=0.25,
+                       budget=DEFAULT_BUDGET, seed=None):
+    """
+    contrarian_search as { "bracket": autofill payload, "win_probability",
+    "expected_score", "candidates" }.
+    """
+    model = get_model()
+    winners, win_probability, expected, n_candidates = contrarian_search(
+        population, field_size, fixed, weight, budget, seed
+    )
+    return {
+        "bracket":         _payload(model, winners, advancement_probabilities("simulation", weight, fixed)),
+        "win_probability": win_probability,
+        "expected_score":  expected,
+        "candidates":      n_candidates,
+    }
@@ -0,0 +1,94 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from simulation import N_GAMES, STRATEGY_RULES, TEAMS, get_model, simulate_brackets, slot_win_counts
+
+# ---------------------------------------
+# PARALLEL MONTE CARLO
+# ---------------------------------------
+# A run is cut into fixed-size shards, and shard i always draws from the
+# i-th child of the master seed. Which process plays a shard doesn't matter,
+# so any number of workers (including one) produces identical totals.
+
+SHARD_SIZE = 250_000
+
+
+@dataclass(frozen=True)
+class ParallelRun:
+    counts: np.ndarray   # (63, 68) slot-win counts, see simulation.slot_win_counts
+    n_sims: int
+    workers: int
+    seconds: float
+
+    @property
+    def sims_per_second(self):
+        return self.n_sims / self.seconds if self.seconds else float("inf")
+
+    @property
+    def probabilities(self):
+        """(63, 68) fraction of simulations in which each team won each game."""
+        return self.counts / self.n_sims
+
+
+def _run_shard(strategy, weight, n_sims, seed_seq):
+    rule = STRATEGY_RULES[strategy](weight)
+    _, winners = simulate_brackets(rule, n_sims, seed=seed_seq)
+    return slot_win_counts(winners, len(TEAMS))
+
+
+def _shards(n_sims, seed):
+    sizes = [SHARD_SIZE] * (n_sims // SHARD_SIZE)
+    if n_sims % SHARD_SIZE:
+        sizes.append(n_sims % SHARD_SIZE)
+    return zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))
+
+
+def run_parallel(n_sims, weight=0.25, strategy="simulation", seed=None, workers=None):
+    """
+    Simulate n_sims tournaments across a process pool and merge the per-shard
+    slot-win counts. workers=1 runs the same shards in this process.
+    """
+    if strategy not in STRATEGY_RULES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    workers = workers or os.cpu_count() or 1
+    get_model()  # fail fast on missing data before forking
+
+    start = time.perf_counter()
+    counts = np.zeros((N_GAMES, len(TEAMS)), dtype=np.int64)
+    shards = list(_shards(int(n_sims), seed))
+
+    if workers == 1:
+        for size, seed_seq in shards:
+            counts += _run_shard(strategy, weight, size, seed_seq)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_shard, strategy, weight, size, seed_seq) for size, seed_seq in shards]
+            for future in futures:
+                counts += future.result()
+
+    return ParallelRun(counts=counts, n_sims=int(n_sims), workers=workers,
+                       seconds=time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a large parallel tournament simulation.")
+    parser.add_argument("n_sims", type=int)
+    parser.add_argument("--weight", type=float, default=0.25)
+    parser.add_argument("--strategy", default="simulation", choices=sorted(STRATEGY_RULES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    run = run_parallel(args.n_sims, args.weight, args.strategy, args.seed, args.workers)
+    champ = run.probabilities[-1]
+    print(f"{run.n_sims:,} tournaments on {run.workers} worker(s) in {run.seconds:.1f}s "
+          f"({run.sims_per_second:,.0f}/s)")
+    for team_id in np.argsort(-champ)[:10]:
+        print(f"  {TEAMS[team_id]:<20} {champ[team_id]:.2%}")
@@ -0,0 +1,169 @@
+import numpy as np
+
+from models import db, Bracket, BracketPicks
+from scoring import bracket_pick_names, bracket_picks
+from simulation import get_model, GAME_CHILDREN, GAME_ROUND, GAME_SLOTS, N_GAMES, ROUND_STARTS, SLOT_TO_GAME
+
+# ---------------------------------------
+# CANONICAL PICKS
+# ---------------------------------------
+# Every bracket's picks as 63 bytes (BracketPicks.picks), in GAME_SLOTS
+# order. A byte is the picked team's id, read exactly as score_bracket reads
+# bracket_data, so scoring from the bytes matches score_bracket for any
+# results naming real teams. Names that aren't teams, and missing picks,
+# get the two codes below.
+
+PICK_UNKNOWN = 254
+PICK_NONE    = 255
+
+BACKFILL_BATCH = 500
+STREAM_CHUNK   = 2_000
+
+
+def canonical_picks(bracket_data, model=None):
+    """
+    Validate a bracket against the tournament structure and encode it.
+
+    Returns (picks, problems): picks is the (63,) uint8 encoding and
+    problems lists every pick that names an unknown team, a team that
+    cannot reach that game, or a team not picked to win the game before it.
+    """
+    model = model or get_model()
+    names = bracket_pick_names(bracket_data)
+    picks = np.full(N_GAMES, PICK_NONE, dtype=np.uint8)
+    ids = np.full(N_GAMES, -1, dtype=np.int64)
+
+    problems = []
+    for g, name in enumerate(names):
+        if not name:
+            continue
+        round_id, slot_index = GAME_SLOTS[g]
+        round_idx = GAME_ROUND[g]
+        if name not in model.team_index:
+            picks[g] = PICK_UNKNOWN
+            if not _is_play_in_line(model, name, g):
+                problems.append(f"{round_id}[{slot_index}]: unknown team {name!r}")
+            continue
+        ids[g] = picks[g] = model.team_index[name]
+        if not _plays_in(model, ids[g], g):
+            problems.append(f"{round_id}[{slot_index}]: {name} cannot play in this game")
+        elif round_idx > 0 and all(ids[c] >= 0 and ids[c] != ids[g] for c in GAME_CHILDREN[g]):
+            problems.append(f"{round_id}[{slot_index}]: {name} was not picked to reach this game")
+    return picks, problems
+
+
+def _is_play_in_line(model, name, game):
+    """An unresolved "A / B" First Four line, advanced as a whole, is a valid pick."""
+    teams = str(name).split(" / ")
+    if len(teams) != 2 or not all(t in model.team_index for t in teams):
+        return False
+    a, b = (model.team_index[t] for t in teams)
+    return model.team_line[a] == model.team_line[b] and _plays_in(model, a, game)
+
+
+def _plays_in(model, team_id, game):
+    """Whether a team's path through the bracket runs through this game."""
+    round_idx = GAME_ROUND[game]
+    return ROUND_STARTS[round_idx] + (model.team_line[team_id] >> (round_idx + 1)) == game
+
+
+def result_problem(round_id, slot_index, winner_name, model=None):
+    """Why a game result can't be recorded, or None if the winner can reach that slot."""
+    model = model or get_model()
+    game = SLOT_TO_GAME.get((round_id, slot_index))
+    if game is None:
+        return f"{round_id}[{slot_index}]: no such game"
+    if winner_name not in model.team_index:
+        return f"{round_id}[{slot_index}]: unknown team {winner_name!r}"
+    if not _plays_in(model, model.team_index[winner_name], game):
+        return f"{round_id}[{slot_index}]: {winner_name} cannot play in this game"
+    return None
+
+
+def decode_picks(blobs):
+    """(n, 63) int64 team ids from stored picks, with -1 for unknown or missing."""
+    picks = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(-1, N_GAMES).astype(np.int64)
+    picks[picks >= PICK_UNKNOWN] = -1
+    return picks
+
+
+def store_picks(bracket, model=None):
+    """Attach canonical picks to a Bracket (before commit); returns the problems."""
+    picks, problems = canonical_picks(bracket.bracket_data, model)
+    if bracket.compact_picks is None:
+        bracket.compact_picks = BracketPicks(picks=picks.tobytes())
+    else:
+        bracket.compact_picks.picks = picks.tobytes()
+    return problems
+
+
+def chunked(rows, size):
+    """Lists of up to `size` consecutive items from an iterable."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _decode_chunk(rows, model):
+    picks = np.full((len(rows), N_GAMES), -1, dtype=np.int64)
+    stored = [i for i, r in enumerate(rows) if r.picks is not None]
+    if stored:
+        picks[stored] = decode_picks([rows[i].picks for i in stored])
+    missing = {rows[i].id: i for i, r in enumerate(rows) if r.picks is None}
+    if missing:
+        for bracket_id, data in (Bracket.query
+                                 .with_entities(Bracket.id, Bracket.bracket_data)
+                                 .filter(Bracket.id.in_(list(missing)))):
+            picks[missing[bracket_id]] = bracket_picks(data, model.team_index)
+    return picks
+
+
+def stream_picks(query, *columns, chunk=STREAM_CHUNK):
+    """
+    Yield (rows, picks) for a Bracket query in id order, `chunk` brackets at
+    a time through a streaming cursor, so memory stays flat however many
+    brackets there are. rows are (id, picks, *columns) tuples and picks is
+    (len(rows), 63) team ids from the compact column. Brackets saved before
+    the column existed are read from bracket_data instead.
+    """
+    model = get_model()
+    rows = (query
+            .outerjoin(BracketPicks, BracketPicks.bracket_id == Bracket.id)
+            .with_entities(Bracket.id, BracketPicks.picks, *columns)
+            .order_by(Bracket.id)
+            .yield_per(chunk))
+    for batch in chunked(rows, chunk):
+        yield batch, _decode_chunk(batch, model)
+
+
+def load_picks(query):
+    """(ids, picks) for every bracket a Bracket query returns, as stream_picks, all at once."""
+    ids, picks = [np.zeros(0, dtype=np.int64)], [np.zeros((0, N_GAMES), dtype=np.int64)]
+    for rows, chunk in stream_picks(query):
+        ids.append(np.array([r.id for r in rows], dtype=np.int64))
+        picks.append(chunk)
+    return np.concatenate(ids), np.vstack(picks)
+
+
+def backfill_picks(batch=BACKFILL_BATCH):
+    """Store canonical picks for every bracket that has none; returns how many."""
+    model = get_model()
+    done = 0
+    while True:
+        brackets = (Bracket.query
+                    .outerjoin(BracketPicks, BracketPicks.bracket_id == Bracket.id)
+                    .filter(BracketPicks.bracket_id.is_(None))
+                    .order_by(Bracket.id)
+                    .limit(batch)
+                    .all())
+        if not brackets:
+            return done
+        for bracket in brackets:
+            store_picks(bracket, model)
+        db.session.commit()
+        done += len(brackets)
@@ -0,0 +1,445 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy.dialects import postgresql, sqlite
+
+from forecasts import GLOBAL_SCOPE
+from models import db, Bracket, BracketPicks, GroupBracketSelection, GroupScore, GroupScoringRules, Standing
+from picks import chunked, stream_picks, STREAM_CHUNK
+from scoring import (
+    DEFAULT_ROUND_POINTS, GAME_POINTS, bulk_scores, game_values, name_vocabulary, results_vector,
+    score_brackets, tiebreak_weights,
+)
+from simulation import get_model, SLOT_TO_GAME
+
+# ---------------------------------------
+# RESULT DELTAS
+# ---------------------------------------
+# Entering or correcting one result changes one game's points: brackets
+# that picked the old winner lose them and brackets that picked the new
+# winner gain them. apply_result_delta finds those brackets by the game's
+# byte in their canonical picks (BracketPicks.picks) and moves their scores
+# with two UPDATE ... SET score = score +/- points statements, inside the
+# transaction that saves the result, so no other bracket is read or
+# written. Anything the compact picks can't express falls back to a full
+# pass (below).
+
+
+def apply_result_delta(round_id, slot_index, old_winner, new_winner):
+    """
+    Move the stored scores for one game whose winner changed from
+    old_winner (None if it had none) to new_winner; call inside the
+    transaction that saves the result. Returns the number of scores moved,
+    or None when it needs a full pass instead: a game outside the 63, a
+    winner that isn't a team, or brackets without canonical picks or a
+    score yet.
+    """
+    game = SLOT_TO_GAME.get((round_id, slot_index))
+    team_index = get_model().team_index
+    if game is None or any(w is not None and w not in team_index for w in (old_winner, new_winner)):
+        return None
+    if (db.session.query(Bracket.id)
+            .outerjoin(BracketPicks, BracketPicks.bracket_id == Bracket.id)
+            .filter(BracketPicks.bracket_id.is_(None) | Bracket.score.is_(None))
+            .first()) is not None:
+        return None
+    if old_winner == new_winner:
+        return 0
+
+    points = int(GAME_POINTS[game])
+    picked = db.func.substr(BracketPicks.picks, game + 1, 1)
+    moved = 0
+    for winner, change in ((old_winner, -points), (new_winner, points)):
+        if winner is None:
+            continue
+        pickers = db.select(BracketPicks.bracket_id).where(picked == bytes([team_index[winner]]))
+        moved += (Bracket.query
+                  .filter(Bracket.id.in_(pickers))
+                  .update({Bracket.score: Bracket.score + change}, synchronize_session=False))
+    return moved
+
+
+# ---------------------------------------
+# FULL RESCORING
+# ---------------------------------------
+# A full pass streams every bracket's id, stored score and canonical picks
+# (picks.stream_picks) STREAM_CHUNK rows at a time, scores each chunk in one
+# array operation and writes only the brackets whose score moved. The
+# comparison is against the score read from the database in the same
+# pass, never a copy held by this process, so passes run by different
+# workers can't hide each other's writes. Scores are written as absolute
+# values with a plain UPDATE ... WHERE id = ?, so a bracket deleted
+# mid-pass is simply skipped.
+
+def _team_results(true_results):
+    """Results as a (63,) team-id vector, or None if canonical picks can't score them."""
+    team_index = get_model().team_index
+    vocab = name_vocabulary(team_index)
+    results, extra = results_vector(true_results, vocab)
+    if extra or len(vocab) > len(team_index):
+        return None
+    return results
+
+
+def _stored(score):
+    # A NULL score never matches, so it gets written
+    return -1 if score is None else score
+
+
+_bracket = Bracket.__table__
+_UPDATE_SCORE = (_bracket.update()
+                 .where(_bracket.c.id == db.bindparam("bracket_id"))
+                 .values(score=db.bindparam("new_score")))
+
+
+def _write_scores(ids, scores):
+    """One executemany UPDATE of the given scores; the caller commits."""
+    if len(ids):
+        db.session.execute(_UPDATE_SCORE, [
+            {"bracket_id": int(i), "new_score": int(score)} for i, score in zip(ids, scores)
+        ])
+
+
+def rescore_all(true_results):
+    """
+    Score every bracket from scratch, streaming STREAM_CHUNK at a time so
+    memory stays flat, and write only the scores that changed. Reads
+    canonical picks when the results only name teams, bracket_data
+    otherwise. Group scores and standings are left to the caller
+    (RescoreWorker). Returns (brackets scanned, scores changed, top score).
+    """
+    results = _team_results(true_results)
+    if results is None:
+        team_index = get_model().team_index
+        rows = (Bracket.query
+                .with_entities(Bracket.id, Bracket.score, Bracket.bracket_data)
+                .order_by(Bracket.id)
+                .yield_per(STREAM_CHUNK))
+        chunks = ((batch, score_brackets([r.bracket_data for r in batch], true_results, team_index))
+                  for batch in chunked(rows, STREAM_CHUNK))
+    else:
+        chunks = ((batch, bulk_scores(picks, results))
+                  for batch, picks in stream_picks(Bracket.query, Bracket.score, chunk=STREAM_CHUNK))
+
+    scanned = changed = top = 0
+    for batch, scores in chunks:
+        ids = np.array([r.id for r in batch], dtype=np.int64)
+        moved = np.flatnonzero(scores != np.array([_stored(r.score) for r in batch]))
+        _write_scores(ids[moved], scores[moved])
+        scanned += len(batch)
+        changed += len(moved)
+        top = max(top, int(scores.max()))
+    db.session.commit()
+    return scanned, changed, top
+
+
+# ---------------------------------------
+# GROUP SCORES
+# ---------------------------------------
+# Every bracket selected into a group is scored under that group's rules
+# (scoring.game_values / tiebreak_weights) and kept in GroupScore, so group
+# pages read stored scores. Rows are upserted on (group_id, bracket_id),
+# like standings, so concurrent refreshes can't collide; only rows whose
+# score or tiebreak moved are rewritten, and rows for brackets no longer
+# selected are dropped.
+
+_group_score = GroupScore.__table__
+
+
+def _group_vectors(results, model, rules):
+    """(points, tiebreak weights) for a group's rules, standard scoring when it has none."""
+    if rules is None:
+        return game_values(results, model, DEFAULT_ROUND_POINTS), tiebreak_weights("none")
+    return (game_values(results, model, rules.round_points, rules.upset_bonus),
+            tiebreak_weights(rules.tiebreaker))
+
+
+def _write_group_scores(entries):
+    """Upsert { group_id, bracket_id, score, tiebreak } rows, rewriting only those that moved."""
+    if not entries:
+        return
+    upsert = _insert(_group_score)
+    new = upsert.excluded
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=["group_id", "bracket_id"],
+        set_={"score": new.score, "tiebreak": new.tiebreak},
+        where=(_group_score.c.score != new.score) | (_group_score.c.tiebreak != new.tiebreak),
+    ), entries)
+
+
+def refresh_group_scores(true_results, group_id=None):
+    """
+    Bring GroupScore in line with the results for one group, or every
+    group, streaming the selected brackets' picks STREAM_CHUNK at a time
+    so memory stays flat however many there are; returns entries scored.
+    """
+    model = get_model()
+    results, _ = results_vector(true_results, name_vocabulary(model.team_index))
+
+    rules = GroupScoringRules.query
+    if group_id is not None:
+        rules = rules.filter(GroupScoringRules.group_id == group_id)
+    rules = {r.group_id: r for r in rules}
+    vectors = {}  # group id -> (points, tiebreak weights)
+
+    selected = (Bracket.query
+                .join(GroupBracketSelection, GroupBracketSelection.bracket_id == Bracket.id)
+                .filter(Bracket.is_submitted.is_(True)))
+    if group_id is not None:
+        selected = selected.filter(GroupBracketSelection.group_id == group_id)
+
+    scored = 0
+    for rows, picks in stream_picks(selected, GroupBracketSelection.group_id):
+        correct = picks == results
+        group_ids = np.array([r.group_id for r in rows], dtype=np.int64)
+        entries = []
+        for g in np.unique(group_ids).tolist():
+            if g not in vectors:
+                vectors[g] = _group_vectors(results, model, rules.get(g))
+            values, weights = vectors[g]
+            at = np.flatnonzero(group_ids == g)
+            entries.extend({"group_id": g, "bracket_id": rows[k].id, "score": int(score), "tiebreak": int(tiebreak)}
+                           for k, score, tiebreak in zip(at, correct[at] @ values, correct[at] @ weights))
+        _write_group_scores(entries)
+        scored += len(entries)
+
+    # Rows for brackets no longer selected, or no longer submitted
+    stale = GroupScore.query
+    if group_id is not None:
+        stale = stale.filter(GroupScore.group_id == group_id)
+    still_selected = (db.select(GroupBracketSelection.id)
+                      .join(Bracket, Bracket.id == GroupBracketSelection.bracket_id)
+                      .where(Bracket.is_submitted.is_(True))
+                      .where(GroupBracketSelection.group_id == GroupScore.group_id)
+                      .where(GroupBracketSelection.bracket_id == GroupScore.bracket_id))
+    stale.filter(~still_selected.exists()).delete(synchronize_session=False)
+    db.session.commit()
+    return scored
+
+
+# ---------------------------------------
+# STANDINGS
+# ---------------------------------------
+# Ranks are computed by the database with RANK() over the stored scores,
+# site-wide from Bracket.score and per group from GroupScore, and kept in
+# Standing so pages look a rank up instead of ranking on every view. The
+# refresh is one INSERT ... SELECT ... ON CONFLICT (scope, bracket_id) DO
+# UPDATE per kind of scope, so the rows never pass through Python and two
+# refreshes running at once (worker threads, other gunicorn processes)
+# can't collide on the unique key. A row is rewritten only when its score
+# or rank moved; when the rank moves, the old one becomes previous_rank.
+
+_standing = Standing.__table__
+_UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert(table):
+    """An INSERT that supports ON CONFLICT on the session's database."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in _UPSERTS:
+        raise RuntimeError(f"Standings need PostgreSQL or SQLite, not {dialect}")
+    return _UPSERTS[dialect](table)
+
+
+def _fresh_standings(scope=None):
+    """SELECTs of (scope, bracket_id, score, rank) straight from the scores."""
+    selects = []
+    if scope is None or scope == GLOBAL_SCOPE:
+        selects.append(db.select(db.literal(GLOBAL_SCOPE), Bracket.id, db.func.coalesce(Bracket.score, 0),
+                                 db.func.rank().over(order_by=Bracket.score.desc()))
+                       .where(Bracket.is_submitted.is_(True)))
+    if scope != GLOBAL_SCOPE:
+        rank = db.func.rank().over(partition_by=GroupScore.group_id,
+                                   order_by=(GroupScore.score.desc(), GroupScore.tiebreak.desc()))
+        in_scope = GroupScore.group_id != GLOBAL_SCOPE if scope is None else GroupScore.group_id == scope
+        selects.append(db.select(GroupScore.group_id, GroupScore.bracket_id, GroupScore.score, rank)
+                       .where(in_scope))
+    return selects
+
+
+def refresh_standings(scope=None):
+    """Bring Standing in line with the stored scores for one scope, or all of them; returns rows written."""
+    written = 0
+    for fresh in _fresh_standings(scope):
+        upsert = _insert(_standing).from_select(["scope", "bracket_id", "score", "rank"], fresh)
+        new = upsert.excluded
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["scope", "bracket_id"],
+            set_={
+                "score":         new.score,
+                "rank":          new.rank,
+                "previous_rank": db.case((_standing.c.rank != new.rank, _standing.c.rank),
+                                         else_=_standing.c.previous_rank),
+            },
+            where=(_standing.c.score != new.score) | (_standing.c.rank != new.rank),
+        )
+        written += db.session.execute(upsert).rowcount
+
+    # Rows for brackets no longer submitted, or no longer selected into the group
+    stale = Standing.query
+    if scope is not None:
+        stale = stale.filter(Standing.scope == scope)
+    site = (Standing.scope == GLOBAL_SCOPE) & ~Standing.bracket_id.in_(
+        db.select(Bracket.id).where(Bracket.is_submitted.is_(True)))
+    group = (Standing.scope != GLOBAL_SCOPE) & ~db.exists().where(
+        (GroupScore.group_id == Standing.scope) & (GroupScore.bracket_id == Standing.bracket_id))
+    written += stale.filter(site | group).delete(synchronize_session=False)
+    db.session.commit()
+    return written
+
+
+# ---------------------------------------
+# BACKGROUND RESCORING
+# ---------------------------------------
+# Request handlers call request() on a CoalescingWorker and return at once.
+# Every request bumps a version; the worker thread wakes, takes the newest
+# version and runs one pass for it, so a burst of submissions or results
+# coalesces into a single pass instead of a queue of them. RescoreWorker
+# collects what was asked for (a full rescore, the group scores and
+# standings after a result delta, or single groups whose selections or
+# rules changed) and does it all in the next pass. Results saved by
+# another worker while a pass runs could be overwritten by this pass's
+# older scores, so a pass is repeated until the results version is the
+# same at both ends.
+#
+# A failed pass is retried after RETRY_DELAY, doubling up to
+# MAX_RETRY_DELAY. After MAX_FAILURES in a row the worker gives up on what
+# is pending until the next request(), which tries once more, so a
+# persistent error costs one pass per request rather than a pass a second.
+# Failures are reported by status().
+
+RETRY_DELAY     = 1
+MAX_RETRY_DELAY = 60
+MAX_FAILURES    = 5
+
+class CoalescingWorker:
+    """
+    Runs job() on one daemon thread, inside an app context, whenever it is
+    requested; requests made while a pass runs share the next pass. job()
+    returns a dict, kept with the pass's duration as last_pass.
+    """
+
+    def __init__(self, app, name, job=None):
+        self.app = app
+        self.name = name
+        self.job = job
+        self.version = 0           # bumped by every request()
+        self.scored_version = 0    # newest version a finished pass covers
+        self.given_up_version = 0  # newest version dropped after MAX_FAILURES
+        self.failures = 0          # failed passes since the last success
+        self.caught_up_at = None
+        self.last_pass = None
+        self.last_error = None
+        self.last_failed_at = None
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def request(self):
+        """Ask for a pass; returns the version that will cover it."""
+        with self._wake:
+            self.version += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._wake.notify()
+            return self.version
+
+    def run_pass(self):
+        return self.job()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while max(self.scored_version, self.given_up_version) >= self.version:
+                    self._wake.wait()
+                target = self.version
+
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    outcome = self.run_pass()
+            except Exception as e:
+                print(f"Background {self.name} error:", e)
+                with self._wake:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    self.last_failed_at = datetime.now(timezone.utc)
+                    if self.failures >= MAX_FAILURES:
+                        self.given_up_version = target
+                        continue
+                    delay = min(RETRY_DELAY * 2 ** (self.failures - 1), MAX_RETRY_DELAY)
+                time.sleep(delay)
+                continue
+
+            with self._wake:
+                self.scored_version = target
+                self.failures = 0
+                self.caught_up_at = datetime.now(timezone.utc)
+                self.last_error = None
+                self.last_pass = {**outcome, "seconds": round(time.perf_counter() - started, 4)}
+
+    def status(self):
+        with self._wake:
+            pending = self.scored_version < self.version
+            return {
+                "version":        self.version,
+                "scored_version": self.scored_version,
+                "pending":        pending,
+                "given_up":       pending and self.given_up_version >= self.version,
+                "failures":       self.failures,
+                "caught_up_at":   self.caught_up_at.isoformat() if self.caught_up_at else None,
+                "last_pass":      self.last_pass,
+                "last_error":     self.last_error,
+                "last_failed_at": self.last_failed_at.isoformat() if self.last_failed_at else None,
+            }
+
+
+FULL_PASS    = "full"     # every bracket's score, then every group score and standing
+DERIVED_PASS = "derived"  # bracket scores are current: every group score and standing
+
+
+class RescoreWorker(CoalescingWorker):
+    def __init__(self, app, load_results, load_version=None):
+        super().__init__(app, "rescore")
+        self.load_results = load_results  # () -> { round_id: [winner, ...] }
+        self.load_version = load_version  # () -> results version, or None
+        self._work = set()  # FULL_PASS, DERIVED_PASS and/or group ids, taken by the next pass
+
+    def request(self, work=FULL_PASS):
+        """
+        Ask for a FULL_PASS, a DERIVED_PASS, or one group's scores and
+        standings by group id; returns the version that will cover it.
+        """
+        with self._wake:
+            self._work.add(work)
+            return super().request()
+
+    def run_pass(self):
+        with self._wake:
+            work, self._work = self._work, set()
+        try:
+            while True:
+                seen = self.load_version() if self.load_version else None
+                outcome = self._refresh(work)
+                if seen is None or self.load_version() == seen:
+                    return outcome
+        except Exception:
+            with self._wake:
+                self._work |= work  # retried by the next pass
+            raise
+
+    def _refresh(self, work):
+        true_results = self.load_results()
+        scanned = changed = 0
+        if FULL_PASS in work:
+            scanned, changed, _ = rescore_all(true_results)
+        if FULL_PASS in work or DERIVED_PASS in work:
+            refresh_group_scores(true_results)
+            refresh_standings()
+            return {"scanned": scanned, "changed": changed}
+        for group_id in sorted(work):
+            refresh_group_scores(true_results, group_id)
+            refresh_standings(group_id)
+        return {"scanned": 0, "changed": 0, "groups": len(work)}
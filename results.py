@@ -0,0 +1,74 @@
+import threading
+
+from cache import cached
+from models import db, TournamentResult, TournamentState
+
+# ---------------------------------------
+# VERSIONED TRUE RESULTS
+# ---------------------------------------
+# Every change to TournamentResult bumps TournamentState.results_version in
+# the same transaction. Each process keeps the shaped results with the
+# version they were built at and, on every read, revalidates them with one
+# primary-key lookup of the version, rebuilding only when it has moved. A
+# rebuild goes through the shared cache first, so after a bump only one
+# worker reads TournamentResult.
+
+_STATE_ID = 1
+
+_cached = None  # (version, { round_id: [winner, ...] })
+_cached_lock = threading.Lock()
+
+
+def results_version():
+    """The current results version; 0 before any result is saved."""
+    version = (db.session.query(TournamentState.results_version)
+               .filter(TournamentState.id == _STATE_ID)
+               .scalar())
+    return version or 0
+
+
+def bump_results_version():
+    """Move the results version on; call inside the transaction that changes results."""
+    bumped = (TournamentState.query
+              .filter(TournamentState.id == _STATE_ID)
+              .update({TournamentState.results_version: TournamentState.results_version + 1},
+                      synchronize_session=False))
+    if not bumped:
+        db.session.add(TournamentState(id=_STATE_ID, results_version=1))
+
+
+def _shape(rows):
+    shaped = {}
+    for r in rows:
+        if r.round_id not in shaped:
+            shaped[r.round_id] = []
+        while len(shaped[r.round_id]) <= r.slot_index:
+            shaped[r.round_id].append(None)
+        shaped[r.round_id][r.slot_index] = r.winner_name
+    return shaped
+
+
+def true_results():
+    """
+    Returns { "west_r64": ["Florida", "Auburn", ...], ... }
+    indexed by slot, matching the bracket.js container IDs. The lists are
+    fresh copies, so callers may change them.
+    """
+    global _cached
+    version = results_version()
+    with _cached_lock:
+        current = _cached
+    if current is None or current[0] != version:
+        current = (version, _load(version))
+        with _cached_lock:
+            _cached = current
+    return {round_id: list(winners) for round_id, winners in current[1].items()}
+
+
+def _load(version):
+    def build():
+        return _shape(TournamentResult.query
+                      .with_entities(TournamentResult.round_id, TournamentResult.slot_index,
+                                     TournamentResult.winner_name)
+                      .all())
+    return cached("results", version, (), build)
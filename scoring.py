@@ -1,3 +1,7 @@
+import numpy as np
+
+from simulation import GAME_ROUND, GAME_SLOTS, ROUND_KEYS, ROUND_STARTS, SLOT_TO_GAME
+
 # Map each round to its "next" rounds (winners advance here)
 _ROUND_TO_NEXT = {
     "west_r64": ["west_r32"], "west_r32": ["west_s16"], "west_s16": ["west_e8"], "west_e8": ["ff_left"],
@@ -9,6 +13,24 @@ _ROUND_TO_NEXT = {
 }
 
 
+ROUND_POINTS = {
+    "r64":          1,
+    "r32":          2,
+    "s16":          4,
+    "e8":           8,
+    "ff_left":      16,
+    "ff_right":     16,
+    "championship": 32,
+}
+
+
+def _pts_for(round_id: str) -> int:
+    for key, pts in ROUND_POINTS.items():
+        if round_id == key or round_id.endswith("_" + key):
+            return pts
+    return 0
+
+
 def _extract_user_winners(user_bracket: dict, round_id: str) -> list:
     """
     Get list of winner names for a round.
@@ -67,22 +89,6 @@ def score_bracket(user_bracket: dict, true_results: dict) -> int:
     true_results: { "west_r64": ["Florida", "Auburn", ...], ... }
     """
 
-    ROUND_POINTS = {
-        "r64":          1,
-        "r32":          2,
-        "s16":          4,
-        "e8":           8,
-        "ff_left":      16,
-        "ff_right":     16,
-        "championship": 32,
-    }
-
-    def _pts_for(round_id: str) -> int:
-        for key, pts in ROUND_POINTS.items():
-            if round_id == key or round_id.endswith("_" + key):
-                return pts
-        return 0
-
     score = 0
 
     for round_id, true_winners in true_results.items():
@@ -101,4 +107,199 @@ def score_bracket(user_bracket: dict, true_results: dict) -> int:
             if i < len(user_picks) and user_picks[i] == true_winner:
                 score += pts
 
-    return score
\ No newline at end of file
+    return score
+
+
+# ---------------------------------------
+# MATRIX SCORING
+# ---------------------------------------
+# Brackets and tournament outcomes as (n, 63) arrays of team ids, indexed
+# like simulation.GAME_SLOTS, with -1 for no pick.
+
+# Points for each game, in GAME_SLOTS order
+GAME_POINTS = np.array([_pts_for(round_id) for round_id, _ in GAME_SLOTS], dtype=np.int64)
+
+
+def bracket_pick_names(user_bracket: dict) -> list:
+    """The name picked to win every game, in GAME_SLOTS order, read exactly as
+    score_bracket reads it; None where there is no pick."""
+    names = []
+    winners_by_round = {}
+    for round_id, slot_index in GAME_SLOTS:
+        if round_id not in winners_by_round:
+            winners_by_round[round_id] = _extract_user_winners(user_bracket or {}, round_id)
+        winners = winners_by_round[round_id]
+        names.append(winners[slot_index] if slot_index < len(winners) else None)
+    return names
+
+
+def bracket_picks(user_bracket: dict, team_index) -> np.ndarray:
+    """
+    The bracket's predicted winner of every game as a (63,) team-id array,
+    read exactly as score_bracket reads it. Names not in team_index
+    (e.g. an unresolved "A / B" First Four line) become -1.
+    """
+    return np.array([
+        team_index.get(name, -1) if isinstance(name, str) else -1
+        for name in bracket_pick_names(user_bracket)
+    ], dtype=np.int64)
+
+
+def _round_team_matrix(ids, values, team_line, n_teams):
+    """
+    Scatter per-game values into (n, rounds * n_teams) columns keyed by
+    (round, team). A team plays at most one game per round, so this is
+    one column per game a team can actually reach; ids placed in a game
+    their line does not feed are dropped, since they can never be right.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    rows, games = np.nonzero(ids >= 0)
+    teams = ids[rows, games]
+    rounds = GAME_ROUND[games]
+    reachable = np.asarray(ROUND_STARTS)[rounds] + (team_line[teams] >> (rounds + 1)) == games
+
+    out = np.zeros((len(ids), len(ROUND_KEYS) * n_teams), dtype=np.float32)
+    out[rows[reachable], rounds[reachable] * n_teams + teams[reachable]] = values[games[reachable]]
+    return out
+
+
+def pick_matrix(picks, team_line, n_teams):
+    """(brackets, rounds * teams) matrix of points each bracket earns per (round, winner)."""
+    return _round_team_matrix(picks, GAME_POINTS.astype(np.float32), team_line, n_teams)
+
+
+def outcome_matrix(outcomes, team_line, n_teams):
+    """(outcomes, rounds * teams) 0/1 matrix of which team won each round's game."""
+    return _round_team_matrix(outcomes, np.ones(len(GAME_SLOTS), dtype=np.float32), team_line, n_teams)
+
+
+def score_matrix(pick_mat, outcome_mat):
+    """(brackets, outcomes) score of every bracket under every outcome."""
+    return (pick_mat @ outcome_mat.T).astype(np.int64)
+
+
+# ---------------------------------------
+# BULK SCORING
+# ---------------------------------------
+# score_bracket for a whole population at once. Every name a bracket or a
+# result mentions gets an integer id from a shared vocabulary (team ids
+# first, then anything else, such as "A / B" First Four lines, in order of
+# appearance), so a pick scores exactly when its id equals the result's.
+
+NO_PICK   = -1
+NO_RESULT = -2
+
+
+def name_vocabulary(team_index) -> dict:
+    """A fresh name -> id vocabulary seeded with the team ids; grows as it is used."""
+    return dict(team_index)
+
+
+def _name_id(name, vocab):
+    if not isinstance(name, str) or not name:
+        return NO_PICK
+    return vocab.setdefault(name, len(vocab))
+
+
+def bracket_pick_ids(user_bracket: dict, vocab: dict) -> np.ndarray:
+    """(63,) int32 id of every pick, read exactly as score_bracket reads it."""
+    return np.array([_name_id(name, vocab) for name in bracket_pick_names(user_bracket)], dtype=np.int32)
+
+
+def results_vector(true_results: dict, vocab: dict):
+    """
+    Split results into a (63,) int32 id vector (NO_RESULT where a game has
+    none) and a dict of any entries outside the 63 bracket slots, which
+    score_bracket still scores and bulk_scores leaves to it.
+    """
+    results = np.full(len(GAME_SLOTS), NO_RESULT, dtype=np.int32)
+    extra = {}
+    for round_id, true_winners in (true_results or {}).items():
+        if round_id == "champion" or _pts_for(round_id) == 0:
+            continue
+        for i, true_winner in enumerate(true_winners or []):
+            if true_winner is None:
+                continue
+            g = SLOT_TO_GAME.get((round_id, i))
+            if g is None:
+                extra.setdefault(round_id, [None] * len(true_winners))[i] = true_winner
+            else:
+                results[g] = _name_id(true_winner, vocab)
+    return results, extra
+
+
+def bulk_scores(pick_ids: np.ndarray, results: np.ndarray) -> np.ndarray:
+    """(brackets,) int64 score of every row of a (brackets, 63) pick-id array."""
+    pick_ids = np.asarray(pick_ids).reshape(-1, len(GAME_SLOTS))
+    return (pick_ids == results) @ GAME_POINTS
+
+
+def score_brackets(user_brackets, true_results: dict, team_index) -> np.ndarray:
+    """score_bracket for a list of brackets, as one (brackets,) int64 array."""
+    vocab = name_vocabulary(team_index)
+    results, extra = results_vector(true_results, vocab)
+    pick_ids = np.array([bracket_pick_ids(b, vocab) for b in user_brackets], dtype=np.int32)
+    scores = bulk_scores(pick_ids, results)
+    if extra:
+        scores += np.array([score_bracket(b or {}, extra) for b in user_brackets], dtype=np.int64)
+    return scores
+
+
+# ---------------------------------------
+# GROUP SCORING RULES
+# ---------------------------------------
+# A group may replace the standard points with its own round points, an
+# upset bonus and a tiebreaker (models.GroupScoringRules). Each rule set
+# becomes a (63,) points vector and a (63,) tiebreak vector, so a group's
+# scores are two matrix products of its brackets' correct picks.
+
+DEFAULT_ROUND_POINTS = [1, 2, 4, 8, 16, 32]
+TIEBREAKERS = ("none", "champion", "late_rounds")
+
+
+def game_values(results, model, round_points=DEFAULT_ROUND_POINTS, upset_bonus=0) -> np.ndarray:
+    """
+    (63,) points a correct pick of each game earns: its round's points plus
+    upset_bonus per seed line the winner was seeded below the team it beat.
+    results is a (63,) team-id vector; the bonus waits until both teams of
+    a game are known.
+    """
+    values = np.asarray(round_points, dtype=np.int64)[GAME_ROUND]
+    if not upset_bonus:
+        return values
+
+    n_teams = len(model.names)
+    line_seed = model.seeds[model.lines[:, 0]]
+    for g, winner in enumerate(results):
+        if not 0 <= winner < n_teams:
+            continue
+        round_idx = GAME_ROUND[g]
+        line = model.team_line[winner]
+        if round_idx == 0:
+            loser_seed = line_seed[line ^ 1]
+        else:
+            other = results[ROUND_STARTS[round_idx - 1] + ((line >> round_idx) ^ 1)]
+            if not 0 <= other < n_teams:
+                continue
+            loser_seed = model.seeds[other]
+        values[g] += upset_bonus * max(0, model.seeds[winner] - loser_seed)
+    return values
+
+
+def tiebreak_weights(tiebreaker: str) -> np.ndarray:
+    """
+    (63,) weights whose product with a bracket's correct picks orders tied
+    brackets, higher first:
+      "none"         ties stand
+      "champion"     a correct champion wins the tie
+      "late_rounds"  more correct picks in the latest round reached wins;
+                     a round has at most 32 games, so base 64 keeps the
+                     rounds from overlapping
+    """
+    if tiebreaker == "champion":
+        weights = np.zeros(len(GAME_SLOTS), dtype=np.int64)
+        weights[-1] = 1
+        return weights
+    if tiebreaker == "late_rounds":
+        return 64 ** GAME_ROUND.astype(np.int64)
+    return np.zeros(len(GAME_SLOTS), dtype=np.int64)
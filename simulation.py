@@ -1,6 +1,14 @@
+import functools
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
 import numpy as np
 import pandas as pd
-import os
+
+from win_probability import data_version, win_probabilities
 
 # ---------------------------------------
 # TEAM & SEED DATA
@@ -61,355 +69,495 @@ FF_RIGHT_REGIONS = {"East", "Midwest"}
 
 
 # ---------------------------------------
-# LOAD DATA
+# BRACKET STRUCTURE
 # ---------------------------------------
+# The 64 bracket lines are numbered region-major (REGIONS order), then by
+# STANDARD_ORDER within a region. The 63 games are numbered round by round,
+# region-major inside each round, so the two games feeding game g of round
+# r > 0 are games ROUND_STARTS[r-1] + 2*(g - ROUND_STARTS[r]) and the next
+# one along; round-0 games are fed by lines 2*g and 2*g + 1.
+
+REGIONS        = ["West", "South", "East", "Midwest"]
+STANDARD_ORDER = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
+ROUND_KEYS     = ["r64", "r32", "s16", "e8", "ff", "championship"]
+ROUND_STARTS   = [0, 32, 48, 56, 60, 62, 63]
+N_LINES        = 64
+N_GAMES        = 63
+
+
+def _game_slots():
+    slots = []
+    for round_key in ROUND_KEYS[:4]:
+        for region in REGIONS:
+            n = N_LINES // 2 // len(REGIONS) >> ROUND_KEYS.index(round_key)
+            slots.extend((REGION_TO_ROUND_ID[region][round_key], i) for i in range(n))
+    slots += [("ff_left", 0), ("ff_right", 0), ("championship", 0)]
+    return slots
+
+
+# game -> (round_id, slot_index), matching TournamentResult and bracket.js
+GAME_SLOTS = _game_slots()
+# (round_id, slot_index) -> game
+SLOT_TO_GAME = {slot: g for g, slot in enumerate(GAME_SLOTS)}
+# game -> round number (index into ROUND_KEYS)
+GAME_ROUND = np.repeat(np.arange(len(ROUND_KEYS)), np.diff(ROUND_STARTS))
 
-def _load_data():
-    base = os.path.dirname(__file__)
-    strengths_path = os.path.join(base, "team_strengths_2025.csv")
-    history_path   = os.path.join(base, "past_tournament_rounds.csv")
 
-    if not os.path.exists(strengths_path):
-        raise FileNotFoundError(f"Missing: {strengths_path}")
-    if not os.path.exists(history_path):
-        raise FileNotFoundError(f"Missing: {history_path}")
+# ---------------------------------------
+# TOURNAMENT MODEL
+# ---------------------------------------
 
-    t_df = pd.read_csv(strengths_path)
-    t_df = t_df[t_df['team'].isin(TEAMS)].copy()
-    t_df.rename(columns={'team': 'team_names'}, inplace=True)
+# Columns of past_tournament_rounds.csv that record a seed *winning* a round:
+# r64, r32, s16, e8, Final Four, Championship
+HISTORY_ROUNDS = ["Round of 32", "Sweet 16", "Elite 8", "Final Four", "Championship Game", "Championship Win"]
 
-    seed_region_df = pd.DataFrame.from_dict(
-        SEED_REGION_MAPPING, orient='index', columns=['Seed', 'Region']
-    ).reset_index().rename(columns={'index': 'team_names'})
+_BASE_DIR      = os.path.dirname(__file__)
+STRENGTHS_PATH = os.path.join(_BASE_DIR, "team_strengths_2025.csv")
+HISTORY_PATH   = os.path.join(_BASE_DIR, "past_tournament_rounds.csv")
 
-    t_df = t_df.merge(seed_region_df, on='team_names', how='left')
 
-    past = pd.read_csv(history_path)
-    round_columns = past.columns[1:]
-    original = past[round_columns].copy()
+@dataclass(frozen=True)
+class TournamentModel:
+    """
+    Immutable, array-backed snapshot of the field and the seed history.
 
-    for i in range(len(round_columns) - 1):
-        past[round_columns[i + 1]] = original[round_columns[i + 1]] / original[round_columns[i]]
-    past.fillna(0, inplace=True)
-    past.drop(columns=["Round of 64"], inplace=True)
-    past.drop(index=[16, 17, 18], errors='ignore', inplace=True)
+    Every per-team array is indexed by team id, which is the team's position
+    in TEAMS. The seed tables are indexed [seed, round] with rounds ordered as
+    HISTORY_ROUNDS (row 0 is unused so a seed can index directly).
+    """
+    version: tuple
+    names: np.ndarray         # (68,) team names
+    seeds: np.ndarray         # (68,) int seed line
+    regions: np.ndarray       # (68,) int index into REGIONS
+    strength: np.ndarray      # (68,) rating mean
+    error: np.ndarray         # (68,) rating std
+    seed_advance: np.ndarray  # (17, 6) P(seed wins round | seed reached round)
+    seed_counts: np.ndarray   # (17, 6) raw historical count of seed winning round
+    lines: np.ndarray         # (64, 2) team ids on each bracket line; column 1 is
+                              #         the First Four opponent, or -1
+    team_line: np.ndarray     # (68,) bracket line of each team
+    team_index: Mapping[str, int]
+
+
+def _frozen(arr):
+    arr.setflags(write=False)
+    return arr
+
+
+def _data_version():
+    for path in (STRENGTHS_PATH, HISTORY_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing: {path}")
+    return os.stat(STRENGTHS_PATH).st_mtime_ns, os.stat(HISTORY_PATH).st_mtime_ns
+
+
+def _build_model(version):
+    t_df = pd.read_csv(STRENGTHS_PATH).drop_duplicates("team").set_index("team")
+    missing = [team for team in TEAMS if team not in t_df.index]
+    if missing:
+        raise ValueError(f"{STRENGTHS_PATH} has no rating for: {', '.join(missing)}")
+    t_df = t_df.loc[TEAMS]
+
+    past = pd.read_csv(HISTORY_PATH).dropna(subset=["Seed"])
+    past["Seed"] = past["Seed"].astype(int)
+    past = past.set_index("Seed").reindex(range(17), fill_value=0)
+
+    seeds   = np.array([SEED_REGION_MAPPING[t][0] for t in TEAMS], dtype=np.int64)
+    regions = np.array([REGIONS.index(SEED_REGION_MAPPING[t][1]) for t in TEAMS], dtype=np.int64)
+
+    lines = np.full((N_LINES, 2), -1, dtype=np.int64)
+    for team_id, (seed, region) in enumerate(zip(seeds, regions)):
+        line = region * len(STANDARD_ORDER) + STANDARD_ORDER.index(seed)
+        lines[line, 0 if lines[line, 0] < 0 else 1] = team_id
+    if (lines[:, 0] < 0).any():
+        raise ValueError("SEED_REGION_MAPPING does not fill every bracket line")
+    team_line = np.empty(len(TEAMS), dtype=np.int64)
+    for line, (team1, team2) in enumerate(lines):
+        team_line[team1] = line
+        if team2 >= 0:
+            team_line[team2] = line
+
+    counts = past[["Round of 64"] + HISTORY_ROUNDS].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        advance = np.nan_to_num(counts[:, 1:] / counts[:, :-1])
+
+    return TournamentModel(
+        version=version,
+        names=_frozen(np.array(TEAMS, dtype=object)),
+        seeds=_frozen(seeds),
+        regions=_frozen(regions),
+        strength=_frozen(t_df["strength"].to_numpy(dtype=float)),
+        error=_frozen(t_df["error"].to_numpy(dtype=float)),
+        seed_advance=_frozen(advance),
+        seed_counts=_frozen(counts[:, 1:].copy()),
+        lines=_frozen(lines),
+        team_line=_frozen(team_line),
+        team_index=MappingProxyType({t: i for i, t in enumerate(TEAMS)}),
+    )
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Return the process-wide TournamentModel, rebuilding it only when one of
+    the source CSVs has been modified since it was last loaded.
+    """
+    global _model
+    version = _data_version()
+    model = _model
+    if model is not None and model.version == version:
+        return model
+    with _model_lock:
+        if _model is None or _model.version != version:
+            _model = _build_model(version)
+        return _model
 
-    t_df = t_df.merge(past, on='Seed', how='left')
 
-    return t_df, past
+# ---------------------------------------
+# RANDOM STREAMS
+# ---------------------------------------
+# Every simulation draws from an explicit numpy Generator rather than the
+# global np.random state, so a seed reproduces a bracket exactly. For
+# parallel work, give each worker its own stream from spawn_rngs(seed, n):
+# the children are statistically independent and are themselves fully
+# determined by the parent seed.
+
+def make_rng(seed=None):
+    """A Generator from an int seed, a SeedSequence, or None for fresh entropy.
+    An existing Generator is returned unchanged."""
+    return np.random.default_rng(seed)
+
+
+def spawn_rngs(seed, n):
+    """n independent child Generators derived from one seed (or SeedSequence)."""
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
 
 
 # ---------------------------------------
 # GAME SIMULATION
 # ---------------------------------------
+# Games are single draws against the precomputed win_probabilities tensor.
+# Every game draws its teams' ratings independently, so one Bernoulli draw
+# at the expected win probability has exactly the distribution of drawing
+# both ratings and comparing them.
 
-def _simulate_game(team1, team2, mean1, mean2, std1, std2, seed1_prob, seed2_prob, weight):
-    r1 = np.clip(np.random.normal(mean1, std1), 0, 1)
-    r2 = np.clip(np.random.normal(mean2, std2), 0, 1)
+def _play(model, kind, weight, team1, team2, round_idx, rng):
+    """Play every matchup in two equally-shaped arrays of team ids."""
+    p = win_probabilities(model, kind, weight)[round_idx + 1, team1, team2]
+    return np.where(rng.random(p.shape) < p, team1, team2)
 
-    s1 = weight * r1 + (1 - weight) * seed1_prob
-    s2 = weight * r2 + (1 - weight) * seed2_prob
 
-    s1 = np.clip(s1, 1e-6, 1 - 1e-6)
-    s2 = np.clip(s2, 1e-6, 1 - 1e-6)
+def probability_rule(kind, weight=0.25):
+    """Pick rule playing every game, First Four included, from one probability source."""
+    def rule(model, team1, team2, round_idx, rng):
+        return _play(model, kind, weight, team1, team2, round_idx, rng)
+    return rule
 
-    log_odds1 = np.log(s1 / (1 - s1))
-    log_odds2 = np.log(s2 / (1 - s2))
 
-    p = 1 / (1 + np.exp(log_odds2 - log_odds1))
-    return team1 if np.random.rand() < p else team2
+# ---------------------------------------
+# BRACKET ENGINE
+# ---------------------------------------
+# A pick rule decides games. It is called as
+#     rule(model, team1, team2, round_idx, rng) -> winners
+# with equally-shaped int arrays of team ids (one column per game in the
+# round, one row per bracket being played) and must return an array of the
+# same shape holding the winner of each matchup. round_idx indexes
+# ROUND_KEYS, or is FIRST_FOUR for the play-in games, and rng is the
+# numpy Generator the rule must draw all of its randomness from. Rules
+# written for a single game can be adapted with per_game().
 
+FIRST_FOUR = -1
 
-def _simulate_first_four(t_df, weight):
-    losers = []
-    grouped = t_df.groupby(['Region', 'Seed'])
 
-    for (region, seed), group in grouped:
-        if len(group) == 2:
-            t1, t2 = group.iloc[0], group.iloc[1]
-            winner = _simulate_game(
-                t1['team_names'], t2['team_names'],
-                t1['strength'], t2['strength'],
-                t1['error'], t2['error'],
-                0, 0, weight
-            )
-            loser = t1['team_names'] if winner != t1['team_names'] else t2['team_names']
-            losers.append(loser)
+def _game_children():
+    children = np.empty((N_GAMES, 2), dtype=np.int64)
+    for round_idx in range(len(ROUND_KEYS)):
+        prev_start = ROUND_STARTS[round_idx - 1] if round_idx else 0
+        for g in range(ROUND_STARTS[round_idx], ROUND_STARTS[round_idx + 1]):
+            first = prev_start + 2 * (g - ROUND_STARTS[round_idx])
+            children[g] = first, first + 1
+    return children
 
-    return t_df[~t_df['team_names'].isin(losers)].copy()
 
+# game -> the two games feeding it (bracket lines for Round of 64 games)
+GAME_CHILDREN = _game_children()
 
-# ---------------------------------------
-# FULL TOURNAMENT SIMULATION
-# ---------------------------------------
 
-def simulate_tournament(weight=0.25):
-    t_df, past = _load_data()
-    t_df = _simulate_first_four(t_df, weight)
-
-    round_names   = ["Round of 64", "Round of 32", "Sweet 16", "Elite 8"]
-    round_id_keys = ["r64", "r32", "s16", "e8"]
-    standard_order = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-    regions = ["West", "South", "East", "Midwest"]
-
-    region_teams = {}
-    for region in regions:
-        r_df = t_df[t_df['Region'] == region].copy()
-        ordered = []
-        for seed in standard_order:
-            match = r_df[r_df['Seed'] == seed]
-            if not match.empty:
-                ordered.append(match.iloc[0])
-        region_teams[region] = ordered
+def per_game(decide):
+    """Adapt decide(model, team1, team2, round_idx, rng) -> winner id to a pick rule."""
+    def rule(model, team1, team2, round_idx, rng):
+        return np.vectorize(lambda a, b: decide(model, int(a), int(b), round_idx, rng), otypes=[np.int64])(team1, team2)
+    return rule
 
-    result = {}
-    region_e8_winners = {}
-
-    for region in regions:
-        current_teams = region_teams[region]
-        round_id_map  = REGION_TO_ROUND_ID[region]
-
-        for round_idx, (round_name, round_key) in enumerate(zip(round_names, round_id_keys)):
-            container_id    = round_id_map[round_key]
-            round_round_idx = round_idx + 1
-
-            team_entries = []
-            winners = []
-
-            for i in range(0, len(current_teams), 2):
-                if i + 1 >= len(current_teams):
-                    break
-
-                t1 = current_teams[i]
-                t2 = current_teams[i + 1]
-
-                try:
-                    seed1_prob = past[past['Seed'] == t1['Seed']].iloc[0][past.columns[round_round_idx]]
-                    seed2_prob = past[past['Seed'] == t2['Seed']].iloc[0][past.columns[round_round_idx]]
-                except (IndexError, KeyError):
-                    seed1_prob = seed2_prob = 0.5
-
-                winner_name = _simulate_game(
-                    t1['team_names'], t2['team_names'],
-                    t1['strength'], t2['strength'],
-                    t1['error'], t2['error'],
-                    seed1_prob, seed2_prob, weight
-                )
-
-                team_entries.append({"seed": int(t1['Seed']), "name": t1['team_names']})
-                team_entries.append({"seed": int(t2['Seed']), "name": t2['team_names']})
-
-                winner_row = t1 if winner_name == t1['team_names'] else t2
-                winners.append(winner_row)
-
-            result[container_id] = team_entries
-            current_teams = winners
-
-        if current_teams:
-            region_e8_winners[region] = current_teams[0]
-
-    ff_left_teams  = [region_e8_winners[r] for r in ["West", "South"]  if r in region_e8_winners]
-    ff_right_teams = [region_e8_winners[r] for r in ["East", "Midwest"] if r in region_e8_winners]
-
-    result["ff_left"]  = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_left_teams]
-    result["ff_right"] = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_right_teams]
-
-    ff_winners = []
-    for ff_teams in [ff_left_teams, ff_right_teams]:
-        if len(ff_teams) == 2:
-            t1, t2 = ff_teams[0], ff_teams[1]
-            w_name = _simulate_game(
-                t1['team_names'], t2['team_names'],
-                t1['strength'], t2['strength'],
-                t1['error'], t2['error'],
-                0.5, 0.5, weight
-            )
-            ff_winners.append(t1 if w_name == t1['team_names'] else t2)
-
-    champion = None
-    if len(ff_winners) == 2:
-        t1, t2 = ff_winners[0], ff_winners[1]
-        result["championship"] = [
-            {"seed": int(t1['Seed']), "name": t1['team_names']},
-            {"seed": int(t2['Seed']), "name": t2['team_names']},
-        ]
-        champ_name = _simulate_game(
-            t1['team_names'], t2['team_names'],
-            t1['strength'], t2['strength'],
-            t1['error'], t2['error'],
-            0.5, 0.5, weight
+
+def _path_game(model, team_id, round_idx):
+    """The game team_id plays in round_idx if it gets that far."""
+    return ROUND_STARTS[round_idx] + (model.team_line[team_id] >> (round_idx + 1))
+
+
+def fixed_results(true_results, model=None):
+    """
+    Turn entered results, shaped { round_id: [winner_name, ...] } as built
+    from TournamentResult, into a (63,) array of forced winners indexed as
+    GAME_SLOTS, with -1 for games still to be played.
+
+    A team recorded as winning a game also won every earlier game on its
+    path. Entries naming unknown teams, teams that cannot reach that game, or
+    contradicting an earlier-round result are ignored.
+    """
+    model = model or get_model()
+    games = np.full(N_GAMES, -1, dtype=np.int64)
+    entered = []
+    for round_id, names in (true_results or {}).items():
+        for slot_index, name in enumerate(names or []):
+            g = SLOT_TO_GAME.get((round_id, slot_index))
+            if g is not None and name in model.team_index:
+                entered.append((g, model.team_index[name]))
+
+    for g, team_id in sorted(entered):
+        round_idx = GAME_ROUND[g]
+        path = [_path_game(model, team_id, r) for r in range(round_idx + 1)]
+        if path[-1] != g or any(games[p] not in (-1, team_id) for p in path):
+            continue
+        games[path] = team_id
+
+    games.setflags(write=False)
+    return games
+
+
+def _fixed_lines(model, fixed):
+    """(64,) team forced onto each line by a fixed Round of 64 result, or -1."""
+    lines = np.full(N_LINES, -1, dtype=np.int64)
+    for team_id in fixed[:ROUND_STARTS[1]]:
+        if team_id >= 0:
+            lines[model.team_line[team_id]] = team_id
+    return lines
+
+
+def play_brackets(rule, n=1, model=None, seed=None, fixed=None):
+    """
+    Play n brackets with a pick rule, all at once.
+
+    Returns (field, winners): field is (n, 64) with the team on every bracket
+    line once the First Four is decided, and winners is (n, 63) with the
+    winner of every game, indexed as GAME_SLOTS. `seed` is anything
+    make_rng() accepts; the same seed always plays the same brackets.
+
+    `fixed`, from fixed_results(), conditions on games already played:
+    those winners are copied in and only the undecided games are simulated.
+    """
+    model = model or get_model()
+    rng = make_rng(seed)
+    if fixed is None:
+        fixed = np.full(N_GAMES, -1, dtype=np.int64)
+    fixed_lines = _fixed_lines(model, fixed)
+
+    play_in = np.flatnonzero((model.lines[:, 1] >= 0) & (fixed_lines < 0))
+    field = np.repeat(np.where(fixed_lines >= 0, fixed_lines, model.lines[:, 0])[None, :], n, axis=0)
+    field[:, play_in] = rule(
+        model, field[:, play_in], np.repeat(model.lines[None, play_in, 1], n, axis=0), FIRST_FOUR, rng
+    )
+
+    winners = np.empty((n, N_GAMES), dtype=np.int64)
+    current = field
+    for round_idx in range(len(ROUND_KEYS)):
+        games = slice(ROUND_STARTS[round_idx], ROUND_STARTS[round_idx + 1])
+        open_games = np.flatnonzero(fixed[games] < 0)
+        played = np.repeat(fixed[None, games], n, axis=0)
+        played[:, open_games] = rule(
+            model, current[:, 2 * open_games], current[:, 2 * open_games + 1], round_idx, rng
         )
-        champion = champ_name
-    else:
-        result["championship"] = []
+        winners[:, games] = current = played
 
-    result["champion"] = champion
+    return field, winners
+
+
+def bracket_payload(field, winners, model=None):
+    """
+    Shape one played bracket as the autofill response:
+    { round_id: [{seed, name}, ...] (two entries per game), ..., "champion": name }
+    """
+    model = model or get_model()
+
+    def entry(team_id):
+        return {"seed": int(model.seeds[team_id]), "name": model.names[team_id]}
+
+    result = {}
+    for region in REGIONS:
+        for round_key in ROUND_KEYS[:4]:
+            result[REGION_TO_ROUND_ID[region][round_key]] = []
+    result["ff_left"], result["ff_right"], result["championship"] = [], [], []
+
+    for g, (round_id, _) in enumerate(GAME_SLOTS):
+        source = field if GAME_ROUND[g] == 0 else winners
+        result[round_id].extend(entry(source[c]) for c in GAME_CHILDREN[g])
+
+    result["champion"] = model.names[winners[-1]]
     return result
 
 
+def build_bracket(rule, seed=None):
+    """Play a single bracket with a pick rule and return its autofill payload."""
+    model = get_model()
+    field, winners = play_brackets(rule, model=model, seed=seed)
+    return bracket_payload(field[0], winners[0], model)
+
+
 # ---------------------------------------
-# CHALK
+# EXACT ADVANCEMENT PROBABILITIES
+# ---------------------------------------
+
+@functools.lru_cache(maxsize=64)
+def _exact_advancement(version, data, kind, weight, fixed):
+    model = get_model()
+    tensor = win_probabilities(model, kind, weight)
+    first_four, rounds = tensor[0], tensor[1:]
+    team_line = model.team_line
+    fixed = np.array(fixed, dtype=np.int64)
+
+    # Everyone starts on their line; play-in teams must first win the First Four
+    prob = np.ones(len(model.names))
+    play_in = np.flatnonzero(model.lines[:, 1] >= 0)
+    a, b = model.lines[play_in, 0], model.lines[play_in, 1]
+    prob[a] = first_four[a, b]
+    prob[b] = first_four[b, a]
+    for line, team_id in enumerate(_fixed_lines(model, fixed)):
+        if team_id >= 0 and model.lines[line, 1] >= 0:
+            prob[model.lines[line]] = model.lines[line] == team_id
+
+    table = np.empty((len(model.names), len(ROUND_KEYS)))
+    for round_idx in range(len(ROUND_KEYS)):
+        # Opponents in round r share a block of 2^(r+1) lines but not the half
+        block = team_line >> (round_idx + 1)
+        half = (team_line >> round_idx) & 1
+        meets = (block[:, None] == block[None, :]) & (half[:, None] != half[None, :])
+        prob = prob * ((meets * rounds[round_idx]) @ prob)
+
+        # A game already played is won by its recorded winner with certainty
+        game_of = ROUND_STARTS[round_idx] + block
+        for g in range(ROUND_STARTS[round_idx], ROUND_STARTS[round_idx + 1]):
+            if fixed[g] >= 0:
+                prob[game_of == g] = 0.0
+                prob[fixed[g]] = 1.0
+        table[:, round_idx] = prob
+
+    table.setflags(write=False)
+    return table
+
+
+def advancement_probabilities(kind="simulation", weight=0.25, fixed=None):
+    """
+    Exact probability of each team winning its game in each round, computed
+    over the bracket tree from win_probabilities(kind) with no sampling.
+    `fixed`, from fixed_results(), conditions on games already played.
+
+    Returns a read-only (68, 6) array indexed [team id, ROUND_KEYS index].
+    Cached per model version, set of results and, for "log5", cbb_25.csv
+    version, so it is only recomputed when the data or the results change.
+    """
+    if kind == "simulation":
+        weight = float(weight)
+    else:
+        weight = None
+    fixed = tuple(int(t) for t in fixed) if fixed is not None else (-1,) * N_GAMES
+    return _exact_advancement(get_model().version, data_version(kind), kind, weight, fixed)
+
+
+# ---------------------------------------
+# FULL TOURNAMENT SIMULATION
 # ---------------------------------------
 
-def chalk_bracket():
-    t_df, _ = _load_data()
-    t_df = _simulate_first_four(t_df, weight=0)
+def simulation_rule(weight=0.25):
+    """Strength/error blended with seed history; the First Four uses strength alone."""
+    return probability_rule("simulation", weight)
 
-    standard_order = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-    regions = ["West", "South", "East", "Midwest"]
-    round_id_keys = ["r64", "r32", "s16", "e8"]
 
-    region_teams = {}
-    for region in regions:
-        r_df = t_df[t_df['Region'] == region].copy()
-        ordered = []
-        for seed in standard_order:
-            match = r_df[r_df['Seed'] == seed]
-            if not match.empty:
-                ordered.append(match.iloc[0])
-        region_teams[region] = ordered
+def simulate_tournament(weight=0.25, seed=None):
+    return build_bracket(simulation_rule(weight), seed)
 
-    result = {}
-    region_e8_winners = {}
-
-    for region in regions:
-        current_teams = region_teams[region]
-        round_id_map  = REGION_TO_ROUND_ID[region]
-
-        for round_key in round_id_keys:
-            container_id = round_id_map[round_key]
-            team_entries = []
-            winners = []
-
-            for i in range(0, len(current_teams), 2):
-                if i + 1 >= len(current_teams):
-                    break
-                t1 = current_teams[i]
-                t2 = current_teams[i + 1]
-
-                team_entries.append({"seed": int(t1['Seed']), "name": t1['team_names']})
-                team_entries.append({"seed": int(t2['Seed']), "name": t2['team_names']})
-
-                winner = t1 if t1['Seed'] <= t2['Seed'] else t2
-                winners.append(winner)
-
-            result[container_id] = team_entries
-            current_teams = winners
-
-        if current_teams:
-            region_e8_winners[region] = current_teams[0]
-
-    ff_left_teams  = [region_e8_winners[r] for r in ["West", "South"]  if r in region_e8_winners]
-    ff_right_teams = [region_e8_winners[r] for r in ["East", "Midwest"] if r in region_e8_winners]
-
-    result["ff_left"]  = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_left_teams]
-    result["ff_right"] = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_right_teams]
-
-    ff_winners = []
-    for ff_teams in [ff_left_teams, ff_right_teams]:
-        if len(ff_teams) == 2:
-            winner = ff_teams[0] if ff_teams[0]['Seed'] <= ff_teams[1]['Seed'] else ff_teams[1]
-            ff_winners.append(winner)
-
-    if len(ff_winners) == 2:
-        t1, t2 = ff_winners[0], ff_winners[1]
-        result["championship"] = [
-            {"seed": int(t1['Seed']), "name": t1['team_names']},
-            {"seed": int(t2['Seed']), "name": t2['team_names']},
-        ]
-        champion = t1['team_names'] if t1['Seed'] <= t2['Seed'] else t2['team_names']
-    else:
-        result["championship"] = []
-        champion = None
 
-    result["champion"] = champion
-    return result
+def simulate_brackets(rule, n_sims, chunk_size=100_000, seed=None, fixed=None):
+    """
+    Play n_sims brackets with any pick rule, chunk_size at a time so memory
+    stays bounded for large runs.
+
+    Returns (first_four, winners):
+      first_four  int8 (n_sims, n_play_in) winner of each First Four game,
+                  in bracket-line order
+      winners     int8 (n_sims, 63) winning team id of every game, indexed
+                  as GAME_SLOTS
+
+    A given (rule, chunk_size, seed) always produces the same arrays.
+    `fixed` conditions on results already entered, as in play_brackets.
+    """
+    model = get_model()
+    rng = make_rng(seed)
+    n_sims = int(n_sims)
+    play_in = np.flatnonzero(model.lines[:, 1] >= 0)
+
+    first_four = np.empty((n_sims, len(play_in)), dtype=np.int8)
+    winners = np.empty((n_sims, N_GAMES), dtype=np.int8)
+
+    for start in range(0, n_sims, chunk_size):
+        stop = min(start + chunk_size, n_sims)
+        field, winners[start:stop] = play_brackets(rule, stop - start, model, rng, fixed)
+        first_four[start:stop] = field[:, play_in]
+
+    return first_four, winners
+
+
+def simulate_tournaments(n_sims, weight=0.25, chunk_size=100_000, seed=None, fixed=None):
+    """Play n_sims full tournaments at once with the simulate_tournament model."""
+    return simulate_brackets(simulation_rule(weight), n_sims, chunk_size, seed, fixed)
+
+
+def slot_win_counts(winners, n_teams=len(TEAMS)):
+    """
+    (63, n_teams) int64 count of how often each team won each game. Counts
+    from separate batches can simply be added together.
+    """
+    flat = np.arange(N_GAMES) * n_teams + winners.astype(np.int64)
+    return np.bincount(flat.ravel(), minlength=N_GAMES * n_teams).reshape(N_GAMES, n_teams)
 
 
 # ---------------------------------------
-# RANDOM (pure 50/50 coin flip every game)
+# CHALK
 # ---------------------------------------
 
-def random_bracket():
-    t_df, _ = _load_data()
-    t_df = _simulate_first_four(t_df, weight=0.5)  # coin flip for First Four too
+def chalk_rule(model, team1, team2, round_idx, rng):
+    """Better seed wins (the first-listed team on a tie); the First Four is a coin flip."""
+    if round_idx == FIRST_FOUR:
+        return np.where(rng.random(team1.shape) < 0.5, team1, team2)
+    return np.where(model.seeds[team1] <= model.seeds[team2], team1, team2)
 
-    standard_order = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-    regions = ["West", "South", "East", "Midwest"]
-    round_id_keys = ["r64", "r32", "s16", "e8"]
 
-    region_teams = {}
-    for region in regions:
-        r_df = t_df[t_df['Region'] == region].copy()
-        ordered = []
-        for seed in standard_order:
-            match = r_df[r_df['Seed'] == seed]
-            if not match.empty:
-                ordered.append(match.iloc[0])
-        region_teams[region] = ordered
+def chalk_bracket(seed=None):
+    return build_bracket(chalk_rule, seed)
 
-    result = {}
-    region_e8_winners = {}
-
-    for region in regions:
-        current_teams = region_teams[region]
-        round_id_map  = REGION_TO_ROUND_ID[region]
-
-        for round_key in round_id_keys:
-            container_id = round_id_map[round_key]
-            team_entries = []
-            winners = []
-
-            for i in range(0, len(current_teams), 2):
-                if i + 1 >= len(current_teams):
-                    break
-                t1 = current_teams[i]
-                t2 = current_teams[i + 1]
-
-                team_entries.append({"seed": int(t1['Seed']), "name": t1['team_names']})
-                team_entries.append({"seed": int(t2['Seed']), "name": t2['team_names']})
-
-                # Pure coin flip — no strength, no seed history
-                winner = t1 if np.random.rand() < 0.5 else t2
-                winners.append(winner)
-
-            result[container_id] = team_entries
-            current_teams = winners
-
-        if current_teams:
-            region_e8_winners[region] = current_teams[0]
-
-    ff_left_teams  = [region_e8_winners[r] for r in ["West", "South"]  if r in region_e8_winners]
-    ff_right_teams = [region_e8_winners[r] for r in ["East", "Midwest"] if r in region_e8_winners]
-
-    result["ff_left"]  = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_left_teams]
-    result["ff_right"] = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_right_teams]
-
-    ff_winners = []
-    for ff_teams in [ff_left_teams, ff_right_teams]:
-        if len(ff_teams) == 2:
-            t1, t2 = ff_teams[0], ff_teams[1]
-            ff_winners.append(t1 if np.random.rand() < 0.5 else t2)
-
-    if len(ff_winners) == 2:
-        t1, t2 = ff_winners[0], ff_winners[1]
-        result["championship"] = [
-            {"seed": int(t1['Seed']), "name": t1['team_names']},
-            {"seed": int(t2['Seed']), "name": t2['team_names']},
-        ]
-        champion = t1['team_names'] if np.random.rand() < 0.5 else t2['team_names']
-    else:
-        result["championship"] = []
-        champion = None
 
-    result["champion"] = champion
-    return result
+# ---------------------------------------
+# RANDOM (pure 50/50 coin flip every game)
+# ---------------------------------------
+
+def coin_flip_rule(model, team1, team2, round_idx, rng):
+    # Pure coin flip — no strength, no seed history (the First Four leans on strength)
+    return _play(model, "coin", None, team1, team2, round_idx, rng)
+
+
+def random_bracket(seed=None):
+    return build_bracket(coin_flip_rule, seed)
 
 
 # ---------------------------------------
 # PROBABILISTIC BY SEED
 # ---------------------------------------
-def random_probabilistic_bracket():
+
+def seed_history_rule(model, team1, team2, round_idx, rng):
     """
     Uses raw historical seed advancement counts to compute head-to-head
     win probabilities for each specific round.
@@ -423,196 +571,36 @@ def random_probabilistic_bracket():
       (A 16-seed that upsets in R64 is still a heavy underdog in R32,
        but has a small nonzero chance rather than an impossible 0%)
     """
-    base = os.path.dirname(__file__)
-    history_path = os.path.join(base, "past_tournament_rounds.csv")
-    raw = pd.read_csv(history_path)
-    # Drop trailing blank rows
-    raw = raw.dropna(subset=['Seed']).copy()
-    raw['Seed'] = raw['Seed'].astype(int)
-
-    # Build a lookup: seed -> dict of round_name -> raw_count
-    # Columns: Seed, Round of 64, Round of 32, Sweet 16, Elite 8,
-    #          Final Four, Championship Game, Championship Win
-    round_col_map = {
-        "r64": "Round of 32",        # winning R64 = appearing in R32 data
-        "r32": "Sweet 16",
-        "s16": "Elite 8",
-        "e8":  "Final Four",
-        "ff":  "Championship Game",
-        "championship": "Championship Win",
-    }
-
-    def get_raw(seed, round_key):
-        row = raw[raw['Seed'] == seed]
-        if row.empty:
-            return 0
-        col = round_col_map.get(round_key)
-        if col is None or col not in raw.columns:
-            return 0
-        return float(row.iloc[0][col])
-
-    def head_to_head_prob(seed_a, seed_b, round_key):
-        """Returns P(seed_a beats seed_b) for the given round."""
-        a = get_raw(seed_a, round_key)
-        b = get_raw(seed_b, round_key)
-        total = a + b
-        if total == 0:
-            return 0.5  # no data, coin flip
-        return a / total
-
-    # ── load teams ──
-    t_df, _ = _load_data()
-    t_df = _simulate_first_four(t_df, weight=0.5)
-
-    standard_order = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-    regions = ["West", "South", "East", "Midwest"]
-    round_id_keys = ["r64", "r32", "s16", "e8"]
-
-    region_teams = {}
-    for region in regions:
-        r_df = t_df[t_df['Region'] == region].copy()
-        ordered = []
-        for seed in standard_order:
-            match = r_df[r_df['Seed'] == seed]
-            if not match.empty:
-                ordered.append(match.iloc[0])
-        region_teams[region] = ordered
+    return _play(model, "seed", None, team1, team2, round_idx, rng)
 
-    result = {}
-    region_e8_winners = {}
-
-    for region in regions:
-        current_teams = region_teams[region]
-        round_id_map  = REGION_TO_ROUND_ID[region]
-
-        for round_key in round_id_keys:
-            container_id = round_id_map[round_key]
-            team_entries = []
-            winners      = []
-
-            for i in range(0, len(current_teams), 2):
-                if i + 1 >= len(current_teams):
-                    break
-                t1 = current_teams[i]
-                t2 = current_teams[i + 1]
-
-                team_entries.append({"seed": int(t1['Seed']), "name": t1['team_names']})
-                team_entries.append({"seed": int(t2['Seed']), "name": t2['team_names']})
-
-                p = head_to_head_prob(int(t1['Seed']), int(t2['Seed']), round_key)
-                winner = t1 if np.random.rand() < p else t2
-                winners.append(winner)
-
-            result[container_id] = team_entries
-            current_teams = winners
-
-        if current_teams:
-            region_e8_winners[region] = current_teams[0]
-
-    # ── Final Four ──
-    ff_left_teams  = [region_e8_winners[r] for r in ["West", "South"]  if r in region_e8_winners]
-    ff_right_teams = [region_e8_winners[r] for r in ["East", "Midwest"] if r in region_e8_winners]
-
-    result["ff_left"]  = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_left_teams]
-    result["ff_right"] = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_right_teams]
-
-    ff_winners = []
-    for ff_teams in [ff_left_teams, ff_right_teams]:
-        if len(ff_teams) == 2:
-            t1, t2 = ff_teams[0], ff_teams[1]
-            p = head_to_head_prob(int(t1['Seed']), int(t2['Seed']), "ff")
-            ff_winners.append(t1 if np.random.rand() < p else t2)
-
-    # ── Championship ──
-    champion = None
-    if len(ff_winners) == 2:
-        t1, t2 = ff_winners[0], ff_winners[1]
-        result["championship"] = [
-            {"seed": int(t1['Seed']), "name": t1['team_names']},
-            {"seed": int(t2['Seed']), "name": t2['team_names']},
-        ]
-        p = head_to_head_prob(int(t1['Seed']), int(t2['Seed']), "championship")
-        champion = t1['team_names'] if np.random.rand() < p else t2['team_names']
-    else:
-        result["championship"] = []
 
-    result["champion"] = champion
-    return result
+def random_probabilistic_bracket(seed=None):
+    return build_bracket(seed_history_rule, seed)
+
 
 # ---------------------------------------
 # BY RANKING (deterministic, highest strength wins)
 # ---------------------------------------
 
-def ranking_bracket():
-    t_df, _ = _load_data()
-    t_df = _simulate_first_four(t_df, weight=1.0)
+def ranking_rule(model, team1, team2, round_idx, rng):
+    if round_idx == FIRST_FOUR:
+        return _play(model, "simulation", 1.0, team1, team2, round_idx, rng)
+    return np.where(model.strength[team1] >= model.strength[team2], team1, team2)
 
-    standard_order = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-    regions = ["West", "South", "East", "Midwest"]
-    round_id_keys = ["r64", "r32", "s16", "e8"]
 
-    region_teams = {}
-    for region in regions:
-        r_df = t_df[t_df['Region'] == region].copy()
-        ordered = []
-        for seed in standard_order:
-            match = r_df[r_df['Seed'] == seed]
-            if not match.empty:
-                ordered.append(match.iloc[0])
-        region_teams[region] = ordered
+def ranking_bracket(seed=None):
+    return build_bracket(ranking_rule, seed)
 
-    result = {}
-    region_e8_winners = {}
-
-    for region in regions:
-        current_teams = region_teams[region]
-        round_id_map  = REGION_TO_ROUND_ID[region]
-
-        for round_key in round_id_keys:
-            container_id = round_id_map[round_key]
-            team_entries = []
-            winners = []
-
-            for i in range(0, len(current_teams), 2):
-                if i + 1 >= len(current_teams):
-                    break
-                t1 = current_teams[i]
-                t2 = current_teams[i + 1]
-
-                team_entries.append({"seed": int(t1['Seed']), "name": t1['team_names']})
-                team_entries.append({"seed": int(t2['Seed']), "name": t2['team_names']})
-
-                winner = t1 if t1['strength'] >= t2['strength'] else t2
-                winners.append(winner)
-
-            result[container_id] = team_entries
-            current_teams = winners
-
-        if current_teams:
-            region_e8_winners[region] = current_teams[0]
-
-    ff_left_teams  = [region_e8_winners[r] for r in ["West", "South"]  if r in region_e8_winners]
-    ff_right_teams = [region_e8_winners[r] for r in ["East", "Midwest"] if r in region_e8_winners]
-
-    result["ff_left"]  = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_left_teams]
-    result["ff_right"] = [{"seed": int(t['Seed']), "name": t['team_names']} for t in ff_right_teams]
-
-    ff_winners = []
-    for ff_teams in [ff_left_teams, ff_right_teams]:
-        if len(ff_teams) == 2:
-            t1, t2 = ff_teams[0], ff_teams[1]
-            ff_winners.append(t1 if t1['strength'] >= t2['strength'] else t2)
-
-    if len(ff_winners) == 2:
-        t1, t2 = ff_winners[0], ff_winners[1]
-        result["championship"] = [
-            {"seed": int(t1['Seed']), "name": t1['team_names']},
-            {"seed": int(t2['Seed']), "name": t2['team_names']},
-        ]
-        champion = t1['team_names'] if t1['strength'] >= t2['strength'] else t2['team_names']
-    else:
-        result["championship"] = []
-        champion = None
 
-    result["champion"] = champion
-    return result
\ No newline at end of file
+# ---------------------------------------
+# STRATEGIES
+# ---------------------------------------
+
+# /autofill_bracket strategy name -> pick rule factory taking the weight
+STRATEGY_RULES = {
+    "simulation":              simulation_rule,
+    "chalk":                   lambda weight: chalk_rule,
+    "random":                  lambda weight: coin_flip_rule,
+    "probabilistic (by seed)": lambda weight: seed_history_rule,
+    "by ranking":              lambda weight: ranking_rule,
+}
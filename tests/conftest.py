@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads its CSVs relative to the working directory and binds the
+# database at import, so both are settled before it is imported.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.pop("CACHE_URL", None)
+
+import app as app_module  # noqa: E402
+import cache  # noqa: E402
+from models import db, User  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The app over empty tables. Set up data inside app.app_context(), but
+    make requests outside it: a request reuses an app context that is
+    already pushed, and with it g's cached login user. Background passes
+    are recorded in app.queued instead of started, so no worker thread
+    outlives its test, and the shared cache starts empty."""
+    flask_app = app_module.app
+    flask_app.queued = []
+    monkeypatch.setattr(cache, "_backend", cache.LocalCache())
+    for name in ("_rescore_worker", "_forecast_worker"):
+        worker = getattr(app_module, name)
+        monkeypatch.setattr(worker, "request",
+                            lambda *work, _name=name: flask_app.queued.append((_name, *work)) or 0)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    return flask_app
+
+
+def make_user(username):
+    user = User(username=username, password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def login(app, user_id):
+    """A test client already signed in as user_id."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import login, make_user
+from models import db
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        user_id = make_user("filler").id
+        db.session.commit()
+    return login(app, user_id)
+
+
+@pytest.mark.parametrize("weight", ["nan", "inf", "-inf", -0.1, 1.5, "heavy", None, [0.25]])
+def test_rejects_weights_outside_zero_to_one(client, weight):
+    response = client.post("/autofill_bracket", json={"strategy": "simulation", "weight": weight})
+    assert response.status_code == 400
+
+
+def test_accepts_a_weight_in_range(client):
+    response = client.post("/autofill_bracket", json={"strategy": "simulation", "weight": "0.5", "seed": 3})
+    assert response.status_code == 200
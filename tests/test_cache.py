@@ -0,0 +1,154 @@
+import os
+
+import pytest
+
+import cache
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenBackend:
+    name = "broken"
+
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ttl):
+        raise ConnectionError("down")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Installs a backend as the process-wide one, with fresh counters."""
+    monkeypatch.setattr(cache, "_stats", type(cache._stats)(cache._stats.default_factory))
+
+    def install(instance):
+        monkeypatch.setattr(cache, "_backend", instance)
+        return instance
+    return install
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return cache.LocalCache()
+    return cache.SQLiteCache(str(tmp_path / "cache.db"))
+
+
+def test_values_expire_after_their_ttl(store, clock):
+    store.set("k", {"a": [1, 2]}, ttl=10)
+    clock.now += 10
+    assert store.get("k") == {"a": [1, 2]}
+    clock.now += 0.5
+    assert store.get("k") is None
+
+
+def test_delete_drops_a_value(store, clock):
+    store.set("k", 1, ttl=10)
+    store.delete("k")
+    assert store.get("k") is None
+
+
+def test_local_cache_evicts_least_recently_used(clock):
+    store = cache.LocalCache(max_entries=2)
+    store.set("a", 1, 10)
+    store.set("b", 2, 10)
+    store.get("a")
+    store.set("c", 3, 10)
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
+
+
+def test_from_url_picks_the_backend(tmp_path):
+    assert isinstance(cache.from_url(""), cache.LocalCache)
+    assert isinstance(cache.from_url(f"sqlite:///{tmp_path}/c.db"), cache.SQLiteCache)
+    with pytest.raises(ValueError):
+        cache.from_url("memcached://localhost")
+
+
+def test_cached_counts_hits_and_misses(backend, clock):
+    backend(cache.LocalCache())
+    builds = []
+
+    def build():
+        builds.append(1)
+        return [len(builds)]
+
+    assert cache.cached("board", 1, ("p1",), build) == [1]
+    assert cache.cached("board", 1, ("p1",), build) == [1]
+    assert cache.stats()["families"]["board"] == {"hits": 1, "misses": 1, "errors": 0}
+
+
+def test_a_new_version_misses(backend, clock):
+    backend(cache.LocalCache())
+    assert cache.cached("results", 1, (), lambda: "v1") == "v1"
+    assert cache.cached("results", 2, (), lambda: "v2") == "v2"
+    assert cache.cached("results", 1, (), lambda: "unused") == "v1"
+    assert cache.stats()["families"]["results"] == {"hits": 1, "misses": 2, "errors": 0}
+
+
+def test_cached_rebuilds_after_the_ttl(backend, clock):
+    backend(cache.LocalCache())
+    cache.cached("odds", 0, (), lambda: "old", ttl=5)
+    clock.now += 6
+    assert cache.cached("odds", 0, (), lambda: "new", ttl=5) == "new"
+
+
+def test_a_failing_backend_falls_through_to_build(backend):
+    backend(BrokenBackend())
+    assert cache.cached("board", 1, (), lambda: "built") == "built"
+    assert cache.peek("board", 1, ()) is None
+    assert cache.put("board", 1, (), "x") is False
+    assert cache.stats() == {
+        "backend": "broken",
+        "pid": os.getpid(),
+        "families": {"board": {"hits": 0, "misses": 0, "errors": 3}},
+    }
+
+
+def test_peek_put_forget(backend, clock):
+    backend(cache.LocalCache())
+    assert cache.peek("autofill_job", 0, ("j1",)) is None
+    assert cache.put("autofill_job", 0, ("j1",), {"status": "running"}, ttl=5)
+    assert cache.peek("autofill_job", 0, ("j1",)) == {"status": "running"}
+    cache.forget("autofill_job", 0, ("j1",))
+    assert cache.peek("autofill_job", 0, ("j1",)) is None
+
+
+def _redis_url():
+    """REDIS_URL (default localhost) when the redis package is installed and a server answers."""
+    redis = pytest.importorskip("redis")
+    url = os.environ.get("REDIS_URL", "redis://localhost:6379/15")
+    try:
+        redis.Redis.from_url(url, socket_timeout=1).ping()
+    except redis.RedisError:
+        pytest.skip(f"no Redis server at {url}")
+    return url
+
+
+def test_redis_cache_round_trip():
+    store = cache.from_url(_redis_url())
+    assert isinstance(store, cache.RedisCache)
+    store.set("test:k", {"a": [1, 2]}, ttl=30)
+    assert store.get("test:k") == {"a": [1, 2]}
+    store.delete("test:k")
+    assert store.get("test:k") is None
+
+
+def test_redis_cache_expires_values():
+    store = cache.from_url(_redis_url())
+    store.set("test:ttl", 1, ttl=0)  # rounded up to the server's 1 s minimum
+    assert store._client.ttl("test:ttl") == 1
+    store.delete("test:ttl")
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import login, make_user
+from leaderboard import my_group_entries
+from models import db, Bracket, Group, GroupBracketSelection, GroupMembership
+
+
+@contextmanager
+def count_queries(engine):
+    """Counts every statement the engine runs inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _join_groups(user, n_groups, others=3):
+    """user joins n_groups groups, each with other members and a selected bracket per member."""
+    for g in range(n_groups):
+        owner = make_user(f"owner{user.id}_{g}")
+        group = Group(name=f"group{user.id}_{g}", password_hash="x", owner_id=owner.id)
+        db.session.add(group)
+        db.session.flush()
+        members = [user] + [make_user(f"member{user.id}_{g}_{k}") for k in range(others)]
+        for k, member in enumerate(members):
+            bracket = Bracket(user_id=member.id, entry_number=1, bracket_name=f"b{k}",
+                              bracket_data={}, score=10 * k, is_submitted=True)
+            db.session.add(bracket)
+            db.session.flush()
+            db.session.add(GroupMembership(group_id=group.id, user_id=member.id))
+            db.session.add(GroupBracketSelection(group_id=group.id, user_id=member.id, bracket_id=bracket.id))
+    db.session.commit()
+
+
+def test_my_groups_query_count_is_constant(app):
+    with app.app_context():
+        one, many = make_user("one"), make_user("many")
+        _join_groups(one, 1)
+        _join_groups(many, 12)
+        user_ids, engine = (one.id, many.id), db.engine
+
+    counts = []
+    for user_id in user_ids:
+        client = login(app, user_id)
+        with count_queries(engine) as statements:
+            response = client.get("/my_groups")
+        assert response.status_code == 200
+        assert f"group{user_id}_0".encode() in response.data
+        counts.append(len(statements))
+
+    # The user load, then the one windowed query, however many groups
+    assert counts == [2, 2]
+
+
+def test_my_groups_ranks_within_each_group(app):
+    with app.app_context():
+        user = make_user("ranked")
+        _join_groups(user, 2)
+        entries = my_group_entries(user.id)
+
+    assert [e["total_entries"] for e in entries] == [4, 4]
+    # user's bracket scores 0 against 10, 20, 30
+    assert all(e["my_entries"][0][1] == 4 for e in entries)
@@ -0,0 +1,58 @@
+import pytest
+
+import odds
+
+
+def test_weight_is_clamped_and_rounded():
+    assert odds.normalize_weight("0.2500001") == 0.25
+    assert odds.normalize_weight(7) == 1.0
+    assert odds.normalize_weight(-1) == 0.0
+    for bad in ("nan", "inf", "-inf"):
+        with pytest.raises(ValueError):
+            odds.normalize_weight(bad)
+
+
+def test_sims_snap_to_the_allowed_steps():
+    assert odds.snap_sims(odds.MAX_SIMS) == max(odds.SIM_STEPS)
+    assert odds.snap_sims(50_001) == 50_000
+    assert odds.snap_sims(1) == min(odds.SIM_STEPS)
+
+
+def test_near_identical_requests_share_one_computation(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr("app.advancement_odds",
+                        lambda weight, n_sims, fixed: calls.append((weight, n_sims)) or {"weight": weight})
+    client = app.test_client()
+    for weight in ("0.2500001", "0.2500002", "0.25"):
+        assert client.get(f"/api/odds?weight={weight}&sims=499999").json == {"weight": 0.25}
+    assert calls == [(0.25, max(odds.SIM_STEPS))]
+
+
+@pytest.mark.parametrize("query", ["weight=nan", "weight=inf", "sims=lots", "mode=fast"])
+def test_rejects_bad_parameters(app, query):
+    assert app.test_client().get(f"/api/odds?{query}").status_code == 400
+
+
+def test_exact_odds_ignore_the_weight_outside_the_simulation_model(app):
+    client = app.test_client()
+    payload = client.get("/api/odds?mode=exact&model=log5&weight=0.9").json
+    assert payload["method"] == "log5" and payload["weight"] is None
+    assert abs(sum(t["champion"] for t in payload["teams"]) - 1) < 1e-9
+
+
+def test_log5_odds_follow_the_cbb_data(app, monkeypatch):
+    import simulation
+    import win_probability
+
+    client = app.test_client()
+    monkeypatch.setattr(win_probability, "_cbb_version", lambda: 1)
+    client.get("/api/odds?mode=exact&model=log5")
+    misses = simulation._exact_advancement.cache_info().misses
+
+    client.get("/api/odds?mode=exact&model=log5")
+    assert simulation._exact_advancement.cache_info().misses == misses
+
+    # An edited cbb_25.csv reaches both the shared cache and the exact tables
+    monkeypatch.setattr(win_probability, "_cbb_version", lambda: 2)
+    client.get("/api/odds?mode=exact&model=log5")
+    assert simulation._exact_advancement.cache_info().misses == misses + 1
@@ -0,0 +1,239 @@
+import threading
+
+from conftest import login, make_user
+from forecasts import GLOBAL_SCOPE
+from models import db, Bracket, Group, GroupBracketSelection, GroupScore, Standing, TournamentResult
+from picks import store_picks
+from rescoring import apply_result_delta, refresh_group_scores, refresh_standings, rescore_all
+from scoring import bracket_pick_names, score_bracket
+from simulation import GAME_SLOTS, STRATEGY_RULES, build_bracket, get_model
+
+
+def _brackets(scores, submitted=True):
+    user = make_user(f"user{len(scores)}_{submitted}")
+    brackets = [Bracket(user_id=user.id, entry_number=1, bracket_data={}, score=score, is_submitted=submitted)
+                for score in scores]
+    db.session.add_all(brackets)
+    db.session.commit()
+    return [b.id for b in brackets]
+
+
+def _standings(scope):
+    rows = Standing.query.filter_by(scope=scope).order_by(Standing.bracket_id)
+    return {row.bracket_id: (row.score, row.rank, row.previous_rank) for row in rows}
+
+
+def test_standings_rank_and_remember_the_previous_rank(app):
+    with app.app_context():
+        a, b, c = _brackets([30, 20, 20])
+        assert refresh_standings() == 3
+        assert _standings(GLOBAL_SCOPE) == {a: (30, 1, None), b: (20, 2, None), c: (20, 2, None)}
+        assert refresh_standings() == 0
+
+        db.session.get(Bracket, c).score = 40
+        db.session.get(Bracket, b).is_submitted = False
+        db.session.commit()
+        assert refresh_standings() == 3
+        assert _standings(GLOBAL_SCOPE) == {a: (30, 2, 1), c: (40, 1, 2)}
+
+
+def test_group_standings_follow_group_scores(app):
+    with app.app_context():
+        a, b = _brackets([0, 0])
+        owner = make_user("owner")
+        group = Group(name="g", password_hash="x", owner_id=owner.id)
+        db.session.add(group)
+        db.session.flush()
+        db.session.add_all([GroupScore(group_id=group.id, bracket_id=a, score=5, tiebreak=1),
+                            GroupScore(group_id=group.id, bracket_id=b, score=5, tiebreak=2)])
+        db.session.commit()
+        refresh_standings(group.id)
+        assert _standings(group.id) == {a: (5, 2, None), b: (5, 1, None)}
+
+        GroupScore.query.filter_by(bracket_id=b).delete()
+        db.session.commit()
+        refresh_standings(group.id)
+        assert _standings(group.id) == {a: (5, 1, 2)}
+        assert _standings(GLOBAL_SCOPE) == {}
+
+
+def test_concurrent_refreshes_do_not_collide(app):
+    with app.app_context():
+        ids = _brackets(list(range(200)))
+
+    errors = []
+
+    def refresh():
+        with app.app_context():
+            try:
+                refresh_standings()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=refresh) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with app.app_context():
+        standings = _standings(GLOBAL_SCOPE)
+    assert len(standings) == len(ids)
+    assert standings[ids[-1]][1] == 1
+
+
+def _simulated(n, user):
+    brackets = []
+    for seed in range(n):
+        bracket = Bracket(user_id=user.id, entry_number=1, is_submitted=True,
+                          bracket_data=build_bracket(STRATEGY_RULES["simulation"](0.25), seed=seed))
+        store_picks(bracket)
+        brackets.append(bracket)
+    db.session.add_all(brackets)
+    db.session.commit()
+    return brackets
+
+
+def _results(bracket_data, games):
+    """true_results in which the given games went the way bracket_data picked them."""
+    names = bracket_pick_names(bracket_data)
+    results = {}
+    for g in games:
+        round_id, slot_index = GAME_SLOTS[g]
+        winners = results.setdefault(round_id, [])
+        winners.extend([None] * (slot_index + 1 - len(winners)))
+        winners[slot_index] = names[g]
+    return results
+
+
+def _group_with(brackets):
+    owner = make_user(f"owner{brackets[0].id}")
+    group = Group(name=f"g{brackets[0].id}", password_hash="x", owner_id=owner.id)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add_all([GroupBracketSelection(group_id=group.id, user_id=b.user_id, bracket_id=b.id)
+                        for b in brackets])
+    db.session.commit()
+    return group.id
+
+
+def _group_scores(group_id):
+    return {row.bracket_id: row.score for row in GroupScore.query.filter_by(group_id=group_id)}
+
+
+def test_group_scores_match_score_bracket(app):
+    with app.app_context():
+        brackets = _simulated(12, make_user("players"))
+        group_id = _group_with(brackets[:8])
+        true_results = _results(brackets[0].bracket_data, range(0, 63, 2))
+
+        assert refresh_group_scores(true_results) == 8
+        assert _group_scores(group_id) == {b.id: score_bracket(b.bracket_data, true_results) for b in brackets[:8]}
+
+        GroupBracketSelection.query.filter_by(bracket_id=brackets[0].id).delete()
+        db.session.commit()
+        refresh_group_scores(true_results, group_id)
+        assert set(_group_scores(group_id)) == {b.id for b in brackets[1:8]}
+
+
+def test_a_refresh_racing_another_does_not_collide(app, monkeypatch):
+    import rescoring
+
+    with app.app_context():
+        brackets = _simulated(10, make_user("players"))
+        group_id = _group_with(brackets)
+        true_results = _results(brackets[0].bracket_data, range(32))
+
+    # A second refresh commits while the first is between reading and writing
+    stream_picks, raced = rescoring.stream_picks, []
+
+    def stream_picks_racing(*args):
+        if not raced:
+            raced.append(True)
+            rival = threading.Thread(target=lambda: _refresh_in(app, true_results, group_id))
+            rival.start()
+            rival.join()
+        return stream_picks(*args)
+
+    monkeypatch.setattr(rescoring, "stream_picks", stream_picks_racing)
+    with app.app_context():
+        refresh_group_scores(true_results, group_id)
+        assert len(_group_scores(group_id)) == 10
+
+
+def _refresh_in(app, true_results, group_id):
+    with app.app_context():
+        refresh_group_scores(true_results, group_id)
+
+
+def _scores(brackets):
+    return {b.id: db.session.get(Bracket, b.id).score for b in brackets}
+
+
+def test_result_deltas_match_a_full_rescore(app):
+    with app.app_context():
+        brackets = _simulated(20, make_user("players"))
+        true_results = _results(brackets[0].bracket_data, range(32))
+        rescore_all(true_results)
+
+        # Enter the first game of round two, correct it, then correct it back
+        round_id, slot_index = GAME_SLOTS[32]
+        picked = bracket_pick_names(brackets[0].bracket_data)[32]
+        other = bracket_pick_names(brackets[1].bracket_data)[32]
+        other = other if other != picked else bracket_pick_names(brackets[0].bracket_data)[0]
+        old = None
+        for winner in (picked, other, picked):
+            true_results.setdefault(round_id, [None])[slot_index] = winner
+            assert apply_result_delta(round_id, slot_index, old, winner) is not None
+            db.session.commit()
+            db.session.expire_all()
+            assert _scores(brackets) == {b.id: score_bracket(b.bracket_data, true_results) for b in brackets}
+            old = winner
+
+
+def test_result_delta_touches_only_pickers(app):
+    with app.app_context():
+        brackets = _simulated(20, make_user("players"))
+        rescore_all({})
+        round_id, slot_index = GAME_SLOTS[0]
+        winner = bracket_pick_names(brackets[0].bracket_data)[0]
+        pickers = sum(bracket_pick_names(b.bracket_data)[0] == winner for b in brackets)
+        assert apply_result_delta(round_id, slot_index, None, winner) == pickers
+        assert apply_result_delta(round_id, slot_index, winner, winner) == 0
+
+
+def test_result_delta_falls_back_to_a_full_pass(app):
+    with app.app_context():
+        brackets = _simulated(3, make_user("players"))
+        team = get_model().names[0]
+        assert apply_result_delta("nowhere", 0, None, team) is None
+        assert apply_result_delta(*GAME_SLOTS[0], None, "Not A Team") is None
+
+        # A bracket saved before canonical picks existed
+        db.session.delete(brackets[0].compact_picks)
+        db.session.commit()
+        assert apply_result_delta(*GAME_SLOTS[0], None, team) is None
+
+
+def test_set_result_applies_the_delta_and_queues_the_rest(app):
+    with app.app_context():
+        brackets = _simulated(10, make_user("players"))
+        admin_id = brackets[0].user_id
+        rescore_all({})
+        picks = {b.id: b.bracket_data for b in brackets}
+        round_id, slot_index = GAME_SLOTS[0]
+        winner = bracket_pick_names(brackets[0].bracket_data)[0]
+
+    response = login(app, admin_id).post("/admin/set_result", headers={"X-Admin-Secret": "alohamora123"},
+                                         json={"round_id": round_id, "slot_index": slot_index,
+                                               "winner_name": winner})
+    assert response.status_code == 200
+    assert response.json["scores_changed"] >= 1
+    assert ("_rescore_worker", "derived") in app.queued
+
+    with app.app_context():
+        true_results = {round_id: [winner]}
+        assert TournamentResult.query.count() == 1
+        assert ({b: db.session.get(Bracket, b).score for b in picks}
+                == {b: score_bracket(data, true_results) for b, data in picks.items()})
@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import login, make_user
+from models import db, Group, GroupScoringRules
+
+
+@pytest.fixture
+def owned_group(app):
+    with app.app_context():
+        owner = make_user("owner")
+        group = Group(name="g", password_hash="x", owner_id=owner.id)
+        db.session.add(group)
+        db.session.commit()
+        return owner.id, group.id
+
+
+@pytest.mark.parametrize("rules", [
+    {"round_points": "123456"},
+    {"round_points": [1, 2, 4, 8, 16]},
+    {"round_points": [1, 2, 4, 8, 16, -32]},
+    {"round_points": [1, 2, 4, 8, 16, 32.5]},
+    {"round_points": [1, 2, 4, 8, 16, "32"]},
+    {"round_points": [True, 2, 4, 8, 16, 32]},
+    {"round_points": {"r64": 1}},
+    {"upset_bonus": "1"},
+    {"upset_bonus": 101},
+])
+def test_rejects_malformed_rules(app, owned_group, rules):
+    owner_id, group_id = owned_group
+    response = login(app, owner_id).post(f"/groups/{group_id}/scoring_rules", json=rules)
+    assert response.status_code == 400
+    with app.app_context():
+        assert GroupScoringRules.query.count() == 0
+
+
+def test_saves_six_round_values(app, owned_group):
+    owner_id, group_id = owned_group
+    response = login(app, owner_id).post(f"/groups/{group_id}/scoring_rules",
+                                         json={"round_points": [1, 2, 3, 4, 5, 6], "upset_bonus": 2})
+    assert response.status_code == 200
+    with app.app_context():
+        rules = GroupScoringRules.query.one()
+        assert (rules.round_points, rules.upset_bonus) == ([1, 2, 3, 4, 5, 6], 2)
+    assert app.queued == [("_rescore_worker", group_id)]
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+import rescoring
+from rescoring import CoalescingWorker
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "worker did not settle"
+        threading.Event().wait(0.01)  # not time.sleep, which a test may patch
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(rescoring, "RETRY_DELAY", 0.01)
+    monkeypatch.setattr(rescoring, "MAX_FAILURES", 3)
+
+
+def test_gives_up_after_max_failures_until_the_next_request(app, fast_retries):
+    calls, failing = [], [True]
+
+    def job():
+        calls.append(1)
+        if failing[0]:
+            raise RuntimeError("database is down")
+        return {"ok": True}
+
+    worker = CoalescingWorker(app, "test", job)
+    worker.request()
+    _wait_for(lambda: worker.status()["given_up"])
+    time.sleep(0.1)
+    status = worker.status()
+    assert len(calls) == 3
+    assert (status["pending"], status["failures"], status["last_error"]) == (True, 3, "database is down")
+
+    # Still failing: one more pass per request, not another round of retries
+    worker.request()
+    _wait_for(lambda: len(calls) == 4 and worker.status()["given_up"])
+    time.sleep(0.1)
+    assert len(calls) == 4
+
+    failing[0] = False
+    worker.request()
+    _wait_for(lambda: not worker.status()["pending"])
+    status = worker.status()
+    assert (status["failures"], status["last_error"], status["given_up"]) == (0, None, False)
+    assert status["last_pass"]["ok"] is True
+
+
+def test_retries_back_off(app, fast_retries, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rescoring.time, "sleep", sleeps.append)
+
+    def job():
+        raise RuntimeError("boom")
+
+    worker = CoalescingWorker(app, "test", job)
+    worker.request()
+    _wait_for(lambda: worker.status()["given_up"])
+    assert sleeps == [0.01, 0.02]
@@ -0,0 +1,198 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------
+# PAIRWISE WIN PROBABILITIES
+# ---------------------------------------
+# Every pick rule, the batch simulator and the exact odds read game
+# probabilities from one precomputed tensor of shape (7, teams, teams):
+# index 0 is the First Four and index r + 1 is round r of ROUND_KEYS, so a
+# rule can look up tensor[round_idx + 1] with FIRST_FOUR == -1. Entry
+# [k, a, b] is P(team a beats team b) in that round.
+#
+# The tensor is built from a TournamentModel (see simulation.get_model) and
+# cached per model version, source and weight.
+
+N_ROUNDS = 6
+
+_BASE_DIR = os.path.dirname(__file__)
+CBB_PATH  = os.path.join(_BASE_DIR, "cbb_25.csv")
+
+_QUADRATURE_NODES = 32
+
+# First Four weight each source plays the play-in games with
+_FIRST_FOUR_WEIGHT = {"seed": 0.5, "coin": 0.5}
+
+# Exponent turning adjusted efficiencies into a Pythagorean win expectancy
+_PYTHAG_EXPONENT = 11.5
+
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# ---------------------------------------
+# STRENGTH / SEED-HISTORY BLEND
+# ---------------------------------------
+
+def _rating_distribution(model):
+    """
+    Discretize each team's clipped-normal rating: the point masses at 0 and 1
+    plus Gauss-Legendre nodes on (0, 1). Returns nodes (K,), shared by every
+    team, and per-team weights (68, K).
+    """
+    x, w = np.polynomial.legendre.leggauss(_QUADRATURE_NODES)
+    x, w = (x + 1) / 2, w / 2
+    mu, sd = model.strength[:, None], model.error[:, None]
+
+    cdf = np.vectorize(lambda z: 0.5 * (1 + math.erf(z / math.sqrt(2))))
+    pdf = np.exp(-0.5 * ((x - mu) / sd) ** 2) / (sd * math.sqrt(2 * math.pi))
+
+    weights = np.hstack([cdf(-mu / sd), w * pdf, 1 - cdf((1 - mu) / sd)])
+    return np.hstack([0.0, x, 1.0]), weights
+
+
+def _seed_prob(model, round_idx):
+    """(17,) seed-history probability each seed line brings into a round."""
+    if round_idx < 0:
+        return np.zeros(len(model.seed_advance))
+    # Seed history only informs the regional rounds; the Final Four and
+    # title game use a neutral 0.5.
+    if round_idx >= 4:
+        return np.full(len(model.seed_advance), 0.5)
+    return model.seed_advance[:, round_idx]
+
+
+def _blend_matrix(model, nodes, weights, seed_prob, weight):
+    """
+    Expected P(a beats b) when each team's rating is drawn from its clipped
+    normal, blended with its seed probability by `weight`, and the two
+    blends are compared as log-odds.
+
+    The blend depends only on (seed, rating node), so the logistic is
+    evaluated once per pair of those rather than per pair of teams.
+    """
+    s = np.clip(weight * nodes[None, :] + (1 - weight) * seed_prob[:, None], 1e-6, 1 - 1e-6)
+    s1 = s[:, :, None, None]
+    s2 = s[None, None, :, :]
+    odds1 = s1 * (1 - s2)
+    p = odds1 / (odds1 + s2 * (1 - s1))  # (seed, node, seed, node)
+
+    by_team = np.einsum("ai,aisj->asj", weights, p[model.seeds], optimize=True)
+    return np.einsum("abj,bj->ab", by_team[:, model.seeds], weights, optimize=True)
+
+
+# ---------------------------------------
+# SEED HEAD-TO-HEAD
+# ---------------------------------------
+
+def _seed_head_to_head(model, round_idx):
+    """P(a beats b) from how often each seed has won this round."""
+    counts = model.seed_counts[model.seeds, round_idx]
+    a, b = counts[:, None], counts[None, :]
+    total = a + b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, a / total, 0.5)  # no data, coin flip
+
+
+# ---------------------------------------
+# LOG5 (cbb_25.csv)
+# ---------------------------------------
+
+def _cbb_version():
+    if not os.path.exists(CBB_PATH):
+        raise FileNotFoundError(f"Missing: {CBB_PATH}")
+    return os.stat(CBB_PATH).st_mtime_ns
+
+
+def data_version(kind):
+    """What a kind's probabilities read besides the model: cbb_25.csv's mtime for "log5", else None."""
+    return _cbb_version() if kind == "log5" else None
+
+
+def _log5_ratings(model):
+    """
+    Each team's barthag (expected win rate against an average team), or the
+    Pythagorean expectancy from adj_o/adj_d where barthag is missing.
+    """
+    cbb = pd.read_csv(CBB_PATH).drop_duplicates("team").set_index("team")
+    missing = [team for team in model.names if team not in cbb.index]
+    if missing:
+        raise ValueError(f"{CBB_PATH} has no row for: {', '.join(missing)}")
+    cbb = cbb.loc[list(model.names)]
+
+    adj_o = cbb["adj_o"].to_numpy(dtype=float) ** _PYTHAG_EXPONENT
+    adj_d = cbb["adj_d"].to_numpy(dtype=float) ** _PYTHAG_EXPONENT
+    rating = cbb["barthag"].to_numpy(dtype=float)
+    rating = np.where(np.isnan(rating), adj_o / (adj_o + adj_d), rating)
+    return np.clip(rating, 1e-6, 1 - 1e-6)
+
+
+def _log5_matrix(ratings):
+    a, b = ratings[:, None], ratings[None, :]
+    return a * (1 - b) / (a * (1 - b) + b * (1 - a))
+
+
+# ---------------------------------------
+# TENSOR
+# ---------------------------------------
+
+def _build_tensor(model, kind, weight):
+    n = len(model.names)
+
+    if kind == "log5":
+        matrix = _log5_matrix(_log5_ratings(model))
+        tensor = np.stack([matrix] * (N_ROUNDS + 1))
+        tensor.setflags(write=False)
+        return tensor
+
+    nodes, weights = _rating_distribution(model)
+    first_four = _blend_matrix(model, nodes, weights, _seed_prob(model, -1), _FIRST_FOUR_WEIGHT.get(kind, weight))
+
+    if kind == "simulation":
+        rounds = [_blend_matrix(model, nodes, weights, _seed_prob(model, r), weight) for r in range(N_ROUNDS)]
+    elif kind == "seed":
+        rounds = [_seed_head_to_head(model, r) for r in range(N_ROUNDS)]
+    elif kind == "coin":
+        rounds = [np.full((n, n), 0.5)] * N_ROUNDS
+    else:
+        raise ValueError(f"Unknown probability model: {kind}")
+
+    tensor = np.stack([first_four] + rounds)
+    tensor.setflags(write=False)
+    return tensor
+
+
+def win_probabilities(model, kind="simulation", weight=0.25):
+    """
+    Read-only (7, 68, 68) tensor of head-to-head win probabilities, indexed
+    [round_idx + 1, team a, team b]. `kind` is one of:
+      "simulation"  strength/error blended with seed history by `weight`
+      "seed"        historical seed head-to-head counts
+      "coin"        50/50 every game (the First Four leans on strength)
+      "log5"        log5 of cbb_25.csv barthag ratings, the same every round
+    `weight` only applies to "simulation".
+    """
+    weight = float(weight) if kind == "simulation" else None
+    data = data_version(kind)
+    key = (model.version, data, kind, weight)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    tensor = _build_tensor(model, kind, weight)
+
+    with _cache_lock:
+        _cache[key] = tensor
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tensor